@@ -0,0 +1,249 @@
+from argparse import ArgumentParser
+import csv
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from scene.geometry import Point
+from scenarios import load_polygons
+from prm import ProbabilisticRandomMap
+from samplers import SAMPLERS
+from sharedmap import SharedRoadmap
+from search import SEARCHES
+
+
+CSV_FIELDS = [
+    "query", "start_x", "start_y", "goal_x", "goal_y",
+    "cost", "milestones", "wall_time", "path",
+]
+
+_polygons = None
+_shared = None
+
+
+def init_worker(scene: str, shared: str = None, radius: float = 0.03) -> None:
+    global _polygons, _shared
+    _polygons = load_polygons(scene)
+    if shared:
+        #Every worker maps the same roadmap instead of building its own
+        _shared = SharedRoadmap(shared, _polygons, radius)
+
+
+def read_queries(path: str) -> list:
+    with open(path) as f:
+        if path.endswith(".csv"):
+            return [
+                {
+                    "start": [float(row["start_x"]), float(row["start_y"])],
+                    "goal": [float(row["goal_x"]), float(row["goal_y"])],
+                }
+                for row in csv.DictReader(f)
+            ]
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def solve_shared(job: tuple) -> dict:
+    query_idx, query, settings = job
+    begin = time.perf_counter()
+    _shared.refresh()
+    cost, path = _shared.query(
+        Point(*query["start"]),
+        Point(*query["goal"]),
+        settings["th"]
+    )
+    wall_time = time.perf_counter() - begin
+
+    points = path.points if path else []
+    return {
+        "query": query_idx,
+        "start": list(query["start"]),
+        "goal": list(query["goal"]),
+        "cost": float(cost) if np.isfinite(cost) else None,
+        "milestones": len(_shared),
+        "wall_time": wall_time,
+        "path": [[float(point.x), float(point.y)] for point in points],
+    }
+
+
+def solve(job: tuple) -> dict:
+    query_idx, query, settings = job
+    if _shared is not None:
+        return solve_shared(job)
+    np.random.seed(settings["seed"] + query_idx)
+    begin = time.perf_counter()
+    prm = ProbabilisticRandomMap(
+        _polygons,
+        settings["radius"],
+        Point(*query["start"]),
+        Point(*query["goal"]),
+        clearance_resolution = settings["clearance_resolution"],
+        sampler = settings["sampler"],
+        seed = settings["seed"] + query_idx,
+        search = settings["search"]
+    )
+    while (
+        not prm.finished() and
+        len(prm.milestones) <= settings["max_milestones"]
+    ):
+        prm.update(th = settings["th"], batch_size = settings["batch_size"])
+    wall_time = time.perf_counter() - begin
+
+    path = prm.shortest_path.points if prm.shortest_path else []
+    return {
+        "query": query_idx,
+        "start": list(query["start"]),
+        "goal": list(query["goal"]),
+        "cost": float(prm.cost) if prm.finished() else None,
+        "milestones": len(prm.milestones),
+        "wall_time": wall_time,
+        "path": [[float(point.x), float(point.y)] for point in path],
+    }
+
+
+def write_results(results: object, output: str, fmt: str) -> int:
+    n_results = 0
+    with open(output, "w", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+        for result in results:
+            if fmt == "csv":
+                writer.writerow({
+                    "query": result["query"],
+                    "start_x": result["start"][0],
+                    "start_y": result["start"][1],
+                    "goal_x": result["goal"][0],
+                    "goal_y": result["goal"][1],
+                    "cost": result["cost"],
+                    "milestones": result["milestones"],
+                    "wall_time": result["wall_time"],
+                    "path": json.dumps(result["path"]),
+                })
+            else:
+                f.write(json.dumps(result) + "\n")
+            n_results += 1
+    return n_results
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "queries",
+        help = "Archivo .jsonl ({\"start\": [x, y], \"goal\": [x, y]}) o .csv (start_x,start_y,goal_x,goal_y)"
+    )
+    parser.add_argument(
+        "--scene",
+        default = "default_polygons",
+        help = "default_polygons, patologycal_grid, narrow_passage o un archivo JSON de polígonos"
+    )
+    parser.add_argument(
+        "--output",
+        default = "results.jsonl",
+        help = "Archivo de resultados"
+    )
+    parser.add_argument(
+        "--format",
+        choices = ["jsonl", "csv"],
+        help = "Formato de salida, por defecto según la extensión de --output"
+    )
+    parser.add_argument(
+        "--workers",
+        default = os.cpu_count(),
+        type = int,
+        help = "Número de procesos"
+    )
+    parser.add_argument(
+        "--radius",
+        default = 0.03,
+        type = float,
+        help = "Radio del robot"
+    )
+    parser.add_argument(
+        "--th",
+        default = 0.5,
+        type = float,
+        help = "Distancia máxima entre milestones conectados"
+    )
+    parser.add_argument(
+        "--max-milestones",
+        default = 2000,
+        type = int,
+        help = "Milestones máximos antes de abandonar una consulta"
+    )
+    parser.add_argument(
+        "--clearance-resolution",
+        default = None,
+        type = int,
+        help = "Resolución de la malla de distancias precalculada (desactivada por defecto)"
+    )
+    parser.add_argument(
+        "--sampler",
+        default = "uniform",
+        choices = list(SAMPLERS),
+        help = "Estrategia de muestreo"
+    )
+    parser.add_argument(
+        "--batch-size",
+        default = 1,
+        type = int,
+        help = "Muestras por llamada a update()"
+    )
+    parser.add_argument(
+        "--search",
+        default = "astar",
+        choices = ["dijkstra", *SEARCHES],
+        help = "Búsqueda del camino más corto en el roadmap"
+    )
+    parser.add_argument(
+        "--shared",
+        default = None,
+        help = "Nombre de un roadmap en memoria compartida publicado por sharedmap.py"
+    )
+    parser.add_argument(
+        "--seed",
+        default = 0,
+        type = int,
+        help = "Semilla base, cada consulta usa seed + índice"
+    )
+
+    args = parser.parse_args()
+    return args
+
+def main() -> None:
+    args = parse_args()
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    settings = {
+        "radius": args.radius,
+        "th": args.th,
+        "max_milestones": args.max_milestones,
+        "seed": args.seed,
+        "clearance_resolution": args.clearance_resolution,
+        "sampler": args.sampler,
+        "batch_size": args.batch_size,
+        "search": args.search,
+    }
+    jobs = [
+        (query_idx, query, settings)
+        for query_idx, query in enumerate(read_queries(args.queries))
+    ]
+
+    begin = time.perf_counter()
+    with multiprocessing.Pool(
+        args.workers,
+        initializer = init_worker,
+        initargs = (args.scene, args.shared, args.radius)
+    ) as pool:
+        results = pool.imap(solve, jobs, chunksize = 4)
+        n_results = write_results(results, args.output, fmt)
+    print(
+        f"{n_results} queries solved in {time.perf_counter() - begin:.2f}s "
+        f"-> {args.output}"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+from argparse import ArgumentParser
+from itertools import product
+import json
+import platform
+import time
+
+import numpy as np
+import scipy
+
+import collisions
+from prm import ProbabilisticRandomMap
+from scene.geometry import Point
+from shapes import Segment
+from scenarios import SCENES, synthetic_polygons
+from samplers import SAMPLERS
+from search import SEARCHES
+
+
+PLAN_QUERIES = {
+    "default_polygons": ((-0.9, -0.9), (0.9, 0.9)),
+    "patologycal_grid": ((-0.9, 0.0), (0.9, 0.0)),
+    "narrow_passage": ((-0.9, 0.0), (0.9, 0.0)),
+}
+#Synthetic scenes plan between the free points closest to these corners
+CORNERS = ((-0.9, -0.9), (0.9, 0.9))
+
+
+def timed(function: object, repeats: int) -> float:
+    #Best of `repeats` runs after a warm up (lazy imports, caches)
+    function()
+    best = np.inf
+    for _ in range(repeats):
+        begin = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def free_points(polygons: list, radius: float, n_points: int, rng: object) -> np.ndarray:
+    points = np.empty((0, 2))
+    while len(points) < n_points:
+        candidates = rng.uniform(-1, 1, (4*n_points, 2))
+        free = ~collisions.points_collide(candidates, polygons, radius)
+        points = np.concatenate([points, candidates[free]])
+    return points[:n_points]
+
+
+def record(results: list, benchmark: str, scene: str, polygons: list, seconds: float, calls: int, **extra) -> None:
+    result = {
+        "benchmark": benchmark,
+        "scene": scene,
+        "polygons": len(polygons),
+        "calls": calls,
+        "seconds": seconds,
+        "per_call": seconds/calls,
+        "throughput": calls/seconds if seconds > 0 else None,
+        **extra,
+    }
+    results.append(result)
+    print(
+        f"{benchmark:>18} {scene:>18} {len(polygons):>6} polygons "
+        f"{result['per_call']*1e6:>12.1f} us/call",
+        extra or ""
+    )
+
+
+def bench_collisions(results: list, scene: str, polygons: list, args: object) -> None:
+    rng = np.random.default_rng(args.seed)
+    points = rng.uniform(-1, 1, (args.calls, 2))
+    ends = points + rng.uniform(-0.25, 0.25, points.shape)
+    point_objects = [Point(*point) for point in points]
+    segments = [
+        Segment(Point(*start), Point(*end))
+        for start, end in zip(points, ends)
+    ]
+    collisions.get_polygon_edges(polygons)
+
+    seconds = timed(
+        lambda: [collisions.point_collides(p, polygons, args.radius) for p in point_objects],
+        args.repeats
+    )
+    record(results, "point_collides", scene, polygons, seconds, args.calls)
+    seconds = timed(
+        lambda: collisions.points_collide(points, polygons, args.radius),
+        args.repeats
+    )
+    record(results, "points_collide", scene, polygons, seconds, args.calls)
+    seconds = timed(
+        lambda: [collisions.segment_collides(s, polygons, args.radius) for s in segments],
+        args.repeats
+    )
+    record(results, "segment_collides", scene, polygons, seconds, args.calls)
+    seconds = timed(
+        lambda: collisions.segments_collide(points, ends, polygons, args.radius),
+        args.repeats
+    )
+    record(results, "segments_collide", scene, polygons, seconds, args.calls)
+
+
+def bench_roadmap(results: list, scene: str, polygons: list, args: object) -> None:
+    rng = np.random.default_rng(args.seed)
+    start, goal = free_points(polygons, args.radius, 2, rng)
+    np.random.seed(args.seed)
+    prm = ProbabilisticRandomMap(
+        polygons,
+        args.radius,
+        Point(*start),
+        Point(*goal),
+        persistent = True
+    )
+    for n_milestones in args.milestones:
+        new_milestones = free_points(
+            polygons,
+            args.radius,
+            n_milestones - len(prm.milestones),
+            rng
+        )
+        prm.milestones.append(new_milestones)
+        begin = time.perf_counter()
+        prm.connect(new_milestones, args.th)
+        seconds = time.perf_counter() - begin
+        record(
+            results, "connect", scene, polygons, seconds, len(new_milestones),
+            milestones = len(prm.milestones),
+            edges = len(prm.edges)
+        )
+        #Search towards the farthest milestone reachable from milestone 0
+        root = prm.components.find(0)
+        reachable = [
+            j for j in range(len(prm.milestones))
+            if prm.components.find(j) == root
+        ]
+        target = max(
+            reachable,
+            key = lambda j: np.linalg.norm(prm.milestones.array[j] - prm.milestones.array[0])
+        )
+        for search in args.searches:
+            prm.search_method = search
+            seconds = timed(
+                lambda: prm.query(Point(*start), Point(*goal), args.th),
+                args.repeats
+            )
+            record(
+                results, "query", scene, polygons, seconds, 1,
+                search = search,
+                milestones = len(prm.milestones),
+                edges = len(prm.edges)
+            )
+            seconds = timed(lambda: prm.get_shortest_path(0, target), args.repeats)
+            record(
+                results, "get_shortest_path", scene, polygons, seconds, 1,
+                search = search,
+                milestones = len(prm.milestones),
+                edges = len(prm.edges),
+                path_cost = float(prm.cost)
+            )
+
+
+def plan_endpoints(scene: str, polygons: list, args: object) -> tuple:
+    if scene in PLAN_QUERIES:
+        return PLAN_QUERIES[scene]
+    candidates = free_points(
+        polygons,
+        args.radius,
+        1000,
+        np.random.default_rng(args.seed)
+    )
+    return tuple(
+        candidates[np.argmin(np.linalg.norm(candidates - corner, axis=1))]
+        for corner in CORNERS
+    )
+
+
+def bench_plan(results: list, scene: str, polygons: list, args: object) -> None:
+    start, goal = plan_endpoints(scene, polygons, args)
+    for sampler, run in product(args.samplers, range(args.repeats)):
+        np.random.seed(args.seed + run)
+        begin = time.perf_counter()
+        prm = ProbabilisticRandomMap(
+            polygons,
+            args.radius,
+            Point(*start),
+            Point(*goal),
+            sampler = sampler,
+            seed = args.seed + run
+        )
+        iterations = 0
+        while not prm.finished() and iterations < args.max_iterations:
+            prm.update(th = args.th, batch_size = args.batch_size)
+            iterations += 1
+        seconds = time.perf_counter() - begin
+        record(
+            results, "plan", scene, polygons, seconds, 1,
+            sampler = sampler,
+            batch_size = args.batch_size,
+            run = run,
+            iterations = iterations,
+            milestones = len(prm.milestones),
+            cost = float(prm.cost) if prm.finished() else None
+        )
+
+
+def bench_lazy(results: list, scene: str, polygons: list, args: object) -> None:
+    #Lazy plans with every search, their paths must be collision free
+    start, goal = plan_endpoints(scene, polygons, args)
+    for search in args.searches:
+        np.random.seed(args.seed)
+        begin = time.perf_counter()
+        prm = ProbabilisticRandomMap(
+            polygons,
+            args.radius,
+            Point(*start),
+            Point(*goal),
+            lazy = True,
+            search = search
+        )
+        iterations = 0
+        while not prm.finished() and iterations < args.max_iterations:
+            prm.update(th = args.th, batch_size = args.batch_size)
+            iterations += 1
+        seconds = time.perf_counter() - begin
+        if prm.finished():
+            points = np.array([[point.x, point.y] for point in prm.shortest_path.points])
+            if prm.validator(points[:-1], points[1:]).any():
+                raise RuntimeError(f"Lazy {search} path collides on {scene}")
+        record(
+            results, "lazy_plan", scene, polygons, seconds, 1,
+            search = search,
+            iterations = iterations,
+            milestones = len(prm.milestones),
+            cost = float(prm.cost) if prm.finished() else None
+        )
+        prm.close()
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--output",
+        default = "benchmark.json",
+        help = "Archivo JSON de resultados"
+    )
+    parser.add_argument(
+        "--synthetic",
+        default = [10, 100, 1000, 10000],
+        type = int,
+        nargs = "*",
+        help = "Número de polígonos de los escenarios sintéticos"
+    )
+    parser.add_argument(
+        "--milestones",
+        default = [250, 1000, 4000],
+        type = int,
+        nargs = "*",
+        help = "Tamaños del roadmap para connect y la búsqueda"
+    )
+    parser.add_argument(
+        "--calls",
+        default = 1000,
+        type = int,
+        help = "Consultas de colisión por medición"
+    )
+    parser.add_argument(
+        "--repeats",
+        default = 3,
+        type = int,
+        help = "Repeticiones de cada medición"
+    )
+    parser.add_argument(
+        "--max-iterations",
+        default = 2000,
+        type = int,
+        help = "Iteraciones máximas de update() por plan"
+    )
+    parser.add_argument(
+        "--samplers",
+        default = ["uniform"],
+        choices = list(SAMPLERS),
+        nargs = "+",
+        help = "Muestreadores a comparar en la planificación"
+    )
+    parser.add_argument(
+        "--searches",
+        default = ["dijkstra", "astar"],
+        choices = ["dijkstra", *SEARCHES],
+        nargs = "+",
+        help = "Búsquedas a comparar en query, get_shortest_path y los planes lazy"
+    )
+    parser.add_argument(
+        "--batch-size",
+        default = 1,
+        type = int,
+        help = "Muestras por llamada a update()"
+    )
+    parser.add_argument(
+        "--radius",
+        default = 0.03,
+        type = float,
+        help = "Radio del robot"
+    )
+    parser.add_argument(
+        "--th",
+        default = 0.5,
+        type = float,
+        help = "Distancia máxima entre milestones conectados"
+    )
+    parser.add_argument(
+        "--seed",
+        default = 0,
+        type = int,
+        help = "Semilla"
+    )
+
+    args = parser.parse_args()
+    return args
+
+def main() -> None:
+    args = parse_args()
+    scenes = dict(SCENES)
+    for n_polygons in args.synthetic:
+        scenes[f"synthetic_{n_polygons}"] = synthetic_polygons(n_polygons, args.seed)
+
+    results = []
+    for scene, polygons in scenes.items():
+        bench_collisions(results, scene, polygons, args)
+        bench_roadmap(results, scene, polygons, args)
+        bench_plan(results, scene, polygons, args)
+        bench_lazy(results, scene, polygons, args)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
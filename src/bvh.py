@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class BoundingVolumeHierarchy:
+    def __init__(self, lows: np.ndarray, highs: np.ndarray, leaf_size: int = 4) -> None:
+        self.lows = np.asarray(lows, dtype=float).reshape(-1, 2)
+        self.highs = np.asarray(highs, dtype=float).reshape(-1, 2)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.lows))
+        node_lows, node_highs = [], []
+        children, ranges = [], []
+
+        #Median split along the longest axis of the box centers
+        centers = (self.lows + self.highs)/2
+        stack = [(0, len(self.lows), -1, 0)]
+        while stack:
+            begin, end, parent, side = stack.pop()
+            node = len(node_lows)
+            if parent >= 0:
+                children[parent][side] = node
+            items = self.order[begin:end]
+            node_lows.append(self.lows[items].min(axis=0))
+            node_highs.append(self.highs[items].max(axis=0))
+            children.append([-1, -1])
+            ranges.append((begin, end))
+            if end - begin <= leaf_size:
+                continue
+            spread = np.ptp(centers[items], axis=0)
+            axis = int(np.argmax(spread))
+            middle = (end - begin)//2
+            split = np.argpartition(centers[items, axis], middle)
+            self.order[begin:end] = items[split]
+            stack.append((begin + middle, end, node, 1))
+            stack.append((begin, begin + middle, node, 0))
+
+        self.node_lows = np.array(node_lows)
+        self.node_highs = np.array(node_highs)
+        self.children = np.array(children, dtype=int)
+        self.ranges = np.array(ranges, dtype=int)
+
+    def __len__(self) -> int:
+        return len(self.lows)
+
+    def query(self, lows: np.ndarray, highs: np.ndarray) -> tuple:
+        #Returns every (query, item) pair whose boxes overlap
+        lows = np.asarray(lows, dtype=float).reshape(-1, 2)
+        highs = np.asarray(highs, dtype=float).reshape(-1, 2)
+        queries = np.arange(len(lows))
+        nodes = np.zeros(len(lows), dtype=int)
+        found_queries, found_items = [], []
+        while len(queries):
+            overlaps = np.all(
+                (lows[queries] <= self.node_highs[nodes]) &
+                (highs[queries] >= self.node_lows[nodes]),
+                axis=1
+            )
+            queries, nodes = queries[overlaps], nodes[overlaps]
+            leaves = self.children[nodes, 0] < 0
+            leaf_queries, leaf_nodes = queries[leaves], nodes[leaves]
+            begins = self.ranges[leaf_nodes, 0]
+            counts = self.ranges[leaf_nodes, 1] - begins
+            found_queries.append(np.repeat(leaf_queries, counts))
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            found_items.append(self.order[np.repeat(begins, counts) + offsets])
+            queries = np.repeat(queries[~leaves], 2)
+            nodes = self.children[nodes[~leaves]].ravel()
+
+        if not found_queries:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        found_queries = np.concatenate(found_queries)
+        found_items = np.concatenate(found_items)
+        overlaps = np.all(
+            (lows[found_queries] <= self.highs[found_items]) &
+            (highs[found_queries] >= self.lows[found_items]),
+            axis=1
+        )
+        return found_queries[overlaps], found_items[overlaps]
@@ -0,0 +1,81 @@
+import numpy as np
+
+import collisions
+
+
+class ClearanceGrid:
+    def __init__(
+            self,
+            polygons: list,
+            resolution: int = 256,
+            low: float = -1.0,
+            high: float = 1.0
+        ) -> None:
+        self.resolution = resolution
+        self.low = low
+        self.high = high
+        self.cell_size = (high - low)/resolution
+        #The signed distance is 1-Lipschitz: inside a cell it differs from
+        #the value at the center by at most half the cell diagonal
+        self.slack = self.cell_size*np.sqrt(2)/2
+        centers = low + self.cell_size*(np.arange(resolution) + 0.5)
+        xs, ys = np.meshgrid(centers, centers, indexing="ij")
+        self.distances = self.signed_distance(
+            polygons,
+            np.column_stack([xs.ravel(), ys.ravel()])
+        ).reshape(resolution, resolution)
+
+    @staticmethod
+    def signed_distance(polygons: list, points: np.ndarray) -> np.ndarray:
+        edges = collisions.get_polygon_edges(polygons)
+        distances = np.empty(len(points))
+        chunk = max(1, collisions.BATCH_SIZE//len(edges))
+        for begin in range(0, len(points), chunk):
+            block = points[begin: begin + chunk]
+            dists = np.sqrt(
+                collisions.points_to_edges_sq_distance(block, edges).min(axis=1)
+            )
+            inside = collisions.points_inside(block, edges)
+            distances[begin: begin + chunk] = np.where(inside, -dists, dists)
+        return distances
+
+    def lookup(self, points: np.ndarray) -> tuple:
+        cells = np.floor((points - self.low)/self.cell_size).astype(int)
+        in_grid = np.all((cells >= 0) & (cells < self.resolution), axis=1)
+        cells = np.clip(cells, 0, self.resolution - 1)
+        return self.distances[cells[:, 0], cells[:, 1]], in_grid
+
+    def classify_points(self, points: np.ndarray, th: float) -> tuple:
+        distances, in_grid = self.lookup(points)
+        free = in_grid & (distances - self.slack >= th)
+        blocked = in_grid & (distances + self.slack < th)
+        return free, blocked
+
+    def classify_segments(
+            self,
+            starts: np.ndarray,
+            ends: np.ndarray,
+            th: float
+        ) -> tuple:
+        #The whole segment lies within half its length of the midpoint
+        half_lens = np.linalg.norm(ends - starts, axis=1)/2
+        distances, in_grid = self.lookup((starts + ends)/2)
+        free = in_grid & (distances - self.slack - half_lens >= th)
+        blocked = (
+            self.classify_points(starts, th)[1] |
+            self.classify_points(ends, th)[1]
+        )
+        return free, blocked
+
+
+_clearance_grids = {}
+
+def get_clearance_grid(polygons: list, resolution: int = 256) -> ClearanceGrid:
+    key = (collisions.polygons_hash(polygons), resolution)
+    grid = _clearance_grids.get(key)
+    if grid is None:
+        if len(_clearance_grids) > 8:
+            _clearance_grids.clear()
+        grid = ClearanceGrid(polygons, resolution)
+        _clearance_grids[key] = grid
+    return grid
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+class CollisionCache:
+    def __init__(self, max_entries: int = 2**16, quantum: float = 1e-9) -> None:
+        self.max_entries = max_entries
+        self.quantum = quantum
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def quantise(self, points: np.ndarray) -> np.ndarray:
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return np.round(points/self.quantum).astype(np.int64)
+
+    def point_keys(self, points: np.ndarray, radius: float, stamp: str) -> list:
+        #The polygon stamp in every key leaves entries of older scenes unreachable
+        return [
+            (stamp, radius, *key)
+            for key in self.quantise(points).tolist()
+        ]
+
+    def segment_keys(
+            self,
+            starts: np.ndarray,
+            ends: np.ndarray,
+            radius: float,
+            stamp: str
+        ) -> list:
+        starts, ends = np.broadcast_arrays(self.quantise(starts), self.quantise(ends))
+        #Segments are symmetric, both directions share one entry
+        swap = (starts[:, 0] > ends[:, 0]) | (
+            (starts[:, 0] == ends[:, 0]) & (starts[:, 1] > ends[:, 1])
+        )
+        first = np.where(swap[:, None], ends, starts)
+        second = np.where(swap[:, None], starts, ends)
+        return [
+            (stamp, radius, *key)
+            for key in np.concatenate([first, second], axis=1).tolist()
+        ]
+
+    def lookup(self, keys: list, compute: object) -> np.ndarray:
+        #compute(idxs) returns the collision mask of the keys not cached yet
+        result = np.zeros(len(keys), dtype=bool)
+        missing = []
+        for idx, key in enumerate(keys):
+            collides = self.entries.get(key)
+            if collides is None:
+                missing.append(idx)
+                continue
+            self.entries.move_to_end(key)
+            result[idx] = collides
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return result
+
+        missing = np.array(missing)
+        result[missing] = compute(missing)
+        for idx, collides in zip(missing.tolist(), result[missing].tolist()):
+            self.entries[keys[idx]] = collides
+        overflow = max(len(self.entries) - self.max_entries, 0)
+        for _ in range(overflow):
+            self.entries.popitem(last = False)
+        self.evictions += overflow
+        return result
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits/lookups if lookups else None,
+        }
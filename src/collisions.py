@@ -1,11 +1,17 @@
+import hashlib
 import sys
 
 import numpy as np
 
 from shapes import Segment, Point, Polygon
+from bvh import BoundingVolumeHierarchy
 
 
 EPS = sys.float_info.epsilon
+#Upper bound of point-edge pairs evaluated at once by the batch queries
+BATCH_SIZE = 2**20
+#Smaller polygon sets are cheaper to test exhaustively than to cull
+BVH_MIN_POLYGONS = 16
 
 def lines_intersect(line_1: Segment, line_2: Segment) -> bool:
     if line_1.points[0] in line_2.points:
@@ -40,30 +46,16 @@ def lines_intersect(line_1: Segment, line_2: Segment) -> bool:
     return True
 
 def point_insise_boundingbox(point: Point, polygon: Polygon) -> bool:
-    xcoords = [vertex.x for vertex in polygon.points]
-    ycoords = [vertex.y for vertex in polygon.points]
     return (
-        min(xcoords) < point.x < max(xcoords) and
-        min(ycoords) < point.y < max(ycoords)
+        polygon.low[0] < point.x < polygon.high[0] and
+        polygon.low[1] < point.y < polygon.high[1]
     )
 
 def bounding_box_overlaps(polygon_a: Polygon, polygon_b: Polygon) -> bool:
-    if len(polygon_a.points) < len(polygon_b.points):
-        simple_polygon = polygon_a
-        hard_polygon = polygon_b
-    else:
-        simple_polygon = polygon_b
-        hard_polygon = polygon_b
-
-    xcoords = [vertex.x for vertex in hard_polygon.points]
-    ycoords = [vertex.y for vertex in hard_polygon.points]
-    minx, maxx = min(xcoords), max(xcoords)
-    miny, maxy = min(ycoords), max(ycoords)
-
-    for point in simple_polygon.points:
-        if minx < point.x < miny and miny < point.y < maxy:
-            return True
-    return False
+    return bool(
+        np.all(polygon_a.low <= polygon_b.high) and
+        np.all(polygon_b.low <= polygon_a.high)
+    )
 
 
 def segment_intersects_polygon(segment: Segment, polygon: Polygon) -> bool:
@@ -78,9 +70,14 @@ def segment_intersects_polygon(segment: Segment, polygon: Polygon) -> bool:
 
 
 def segment_intersects(segment: Segment, polygons: list) -> bool:
+    xcoords = [point.x for point in segment.points]
+    ycoords = [point.y for point in segment.points]
+    low = np.array([min(xcoords), min(ycoords)])
+    high = np.array([max(xcoords), max(ycoords)])
     intersections = (
         segment_intersects_polygon(segment, polygon)
         for polygon in polygons
+        if np.all(polygon.low <= high) and np.all(low <= polygon.high)
     )
     return any(intersections)
 
@@ -144,29 +141,292 @@ def point_collides_with_polygon(
     return False
 
 
+class PolygonEdges:
+    def __init__(self, polygons: list) -> None:
+        vertices = [polygon.vertices for polygon in polygons]
+        self.starts = np.concatenate(vertices)
+        self.ends = np.concatenate(
+            [np.roll(polygon_vertices, -1, axis=0) for polygon_vertices in vertices]
+        )
+        self.counts = np.array([len(v) for v in vertices])
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.deltas = self.ends - self.starts
+        self.sq_lens = np.einsum("ij,ij->i", self.deltas, self.deltas)
+        self.sq_lens[self.sq_lens == 0] = 1.0
+        self.bvh = None
+        if len(polygons) >= BVH_MIN_POLYGONS:
+            self.bvh = BoundingVolumeHierarchy(
+                [polygon.low for polygon in polygons],
+                [polygon.high for polygon in polygons]
+            )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+_polygon_edges_cache = {}
+
+def get_polygon_edges(polygons: list) -> PolygonEdges:
+    key = tuple(polygons)
+    edges = _polygon_edges_cache.get(key)
+    if edges is None:
+        if len(_polygon_edges_cache) > 32:
+            _polygon_edges_cache.clear()
+        edges = PolygonEdges(polygons)
+        _polygon_edges_cache[key] = edges
+    return edges
+
+
+def polygons_hash(polygons: list) -> str:
+    digest = hashlib.sha1()
+    for polygon in polygons:
+        digest.update(np.int64(len(polygon.vertices)).tobytes())
+        digest.update(np.ascontiguousarray(polygon.vertices).tobytes())
+    return digest.hexdigest()
+
+
+def points_inside(points: np.ndarray, edges: PolygonEdges) -> np.ndarray:
+    #Crossing number of an horizontal ray towards +x, per polygon
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    ay, by = edges.starts[:, 1], edges.ends[:, 1]
+    straddles = (ay > y) != (by > y)
+    dy = np.where(ay == by, 1.0, by - ay)
+    x_cross = edges.starts[:, 0] + (y - ay)*edges.deltas[:, 0]/dy
+    crossings = straddles & (x < x_cross)
+    per_polygon = np.add.reduceat(crossings, edges.offsets, axis=1)
+    return np.any(per_polygon % 2 == 1, axis=1)
+
+
+def sq_distance_to_segments(
+        px: np.ndarray,
+        py: np.ndarray,
+        starts: np.ndarray,
+        deltas: np.ndarray,
+        sq_lens: np.ndarray
+    ) -> np.ndarray:
+    rel_x = px - starts[..., 0]
+    rel_y = py - starts[..., 1]
+    t = (rel_x*deltas[..., 0] + rel_y*deltas[..., 1])/sq_lens
+    t = np.clip(t, 0.0, 1.0)
+    dx = rel_x - t*deltas[..., 0]
+    dy = rel_y - t*deltas[..., 1]
+    return dx*dx + dy*dy
+
+
+def points_to_edges_sq_distance(
+        points: np.ndarray,
+        edges: PolygonEdges
+    ) -> np.ndarray:
+    return sq_distance_to_segments(
+        points[:, 0:1],
+        points[:, 1:2],
+        edges.starts,
+        edges.deltas,
+        edges.sq_lens
+    )
+
+
+def orientation(ox, oy, ux, uy, vx, vy) -> np.ndarray:
+    return (ux - ox)*(vy - oy) - (uy - oy)*(vx - ox)
+
+
+def segments_cross(px, py, qx, qy, ax, ay, bx, by) -> np.ndarray:
+    o1 = orientation(ax, ay, bx, by, px, py)
+    o2 = orientation(ax, ay, bx, by, qx, qy)
+    o3 = orientation(px, py, qx, qy, ax, ay)
+    o4 = orientation(px, py, qx, qy, bx, by)
+    return (o1*o2 < 0) & (o3*o4 < 0)
+
+
+def segments_cross_edges(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        edges: PolygonEdges
+    ) -> np.ndarray:
+    #Proper crossings only, touching is covered by the distance test
+    px, py = starts[:, 0:1], starts[:, 1:2]
+    qx, qy = ends[:, 0:1], ends[:, 1:2]
+    ax, ay = edges.starts[:, 0], edges.starts[:, 1]
+    bx, by = edges.ends[:, 0], edges.ends[:, 1]
+    return segments_cross(px, py, qx, qy, ax, ay, bx, by)
+
+
+def segments_to_edges_sq_distance(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        edges: PolygonEdges
+    ) -> np.ndarray:
+    deltas = ends - starts
+    sq_lens = np.einsum("ij,ij->i", deltas, deltas)
+    sq_lens[sq_lens == 0] = 1.0
+    #Distance between non crossing segments is reached at an endpoint
+    sq_dists = np.minimum(
+        points_to_edges_sq_distance(starts, edges),
+        points_to_edges_sq_distance(ends, edges)
+    )
+    for vertices in (edges.starts, edges.ends):
+        sq_dists = np.minimum(
+            sq_dists,
+            sq_distance_to_segments(
+                vertices[:, 0],
+                vertices[:, 1],
+                starts[:, None, :],
+                deltas[:, None, :],
+                sq_lens[:, None]
+            )
+        )
+    sq_dists[segments_cross_edges(starts, ends, edges)] = 0.0
+    return sq_dists
+
+
+def culled_segments_collide(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        edges: PolygonEdges,
+        th: float
+    ) -> np.ndarray:
+    #Broad phase: only polygons whose inflated box overlaps the query's box
+    pair_queries, pair_polygons = edges.bvh.query(
+        np.minimum(starts, ends) - th,
+        np.maximum(starts, ends) + th
+    )
+    collides = np.zeros(len(starts), dtype=bool)
+    if not len(pair_queries):
+        return collides
+    counts = edges.counts[pair_polygons]
+    pair_begins = np.cumsum(counts) - counts
+    queries = np.repeat(pair_queries, counts)
+    edge_idxs = (
+        np.repeat(edges.offsets[pair_polygons] - pair_begins, counts) +
+        np.arange(counts.sum())
+    )
+
+    p, r = starts[queries], ends[queries]
+    a, b = edges.starts[edge_idxs], edges.ends[edge_idxs]
+    deltas = r - p
+    sq_lens = np.einsum("ij,ij->i", deltas, deltas)
+    sq_lens[sq_lens == 0] = 1.0
+    sq_dists = np.minimum.reduce([
+        sq_distance_to_segments(
+            p[:, 0], p[:, 1], a, edges.deltas[edge_idxs], edges.sq_lens[edge_idxs]
+        ),
+        sq_distance_to_segments(
+            r[:, 0], r[:, 1], a, edges.deltas[edge_idxs], edges.sq_lens[edge_idxs]
+        ),
+        sq_distance_to_segments(a[:, 0], a[:, 1], p, deltas, sq_lens),
+        sq_distance_to_segments(b[:, 0], b[:, 1], p, deltas, sq_lens),
+    ])
+    crosses = segments_cross(
+        p[:, 0], p[:, 1], r[:, 0], r[:, 1],
+        a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    )
+    sq_dists[crosses] = 0.0
+
+    straddles = (a[:, 1] > p[:, 1]) != (b[:, 1] > p[:, 1])
+    dy = np.where(a[:, 1] == b[:, 1], 1.0, b[:, 1] - a[:, 1])
+    x_cross = a[:, 0] + (p[:, 1] - a[:, 1])*(b[:, 0] - a[:, 0])/dy
+    crossings = straddles & (p[:, 0] < x_cross)
+    inside = np.add.reduceat(crossings, pair_begins) % 2 == 1
+    near = np.minimum.reduceat(sq_dists, pair_begins) < th*th
+    collides[pair_queries[inside | near]] = True
+    return collides
+
+
+def points_collide(
+        points: np.ndarray,
+        polygons: list,
+        th: float,
+        clearance: object = None
+    ) -> np.ndarray:
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    collides = np.zeros(len(points), dtype=bool)
+    if not polygons or not len(points):
+        return collides
+    pending = np.arange(len(points))
+    if clearance is not None:
+        #Only points close to the inflated obstacles need the exact test
+        free, blocked = clearance.classify_points(points, th)
+        collides[blocked] = True
+        pending = np.flatnonzero(~(free | blocked))
+    edges = get_polygon_edges(polygons)
+    if edges.bvh is not None:
+        collides[pending] = culled_segments_collide(
+            points[pending],
+            points[pending],
+            edges,
+            th
+        )
+        return collides
+    chunk = max(1, BATCH_SIZE//len(edges))
+    for begin in range(0, len(pending), chunk):
+        block_idxs = pending[begin: begin + chunk]
+        block = points[block_idxs]
+        sq_dists = points_to_edges_sq_distance(block, edges)
+        collides[block_idxs] = (
+            points_inside(block, edges) |
+            (sq_dists.min(axis=1) < th*th)
+        )
+    return collides
+
+
 def point_collides(point: Point, polygons: list, th: float) -> bool:
-    collisions = (
-        point_collides_with_polygon(
-            point,
-            polygon,
+    return bool(points_collide([point.x, point.y], polygons, th)[0])
+
+
+def segments_collide(
+        starts: np.ndarray,
+        ends: np.ndarray,
+        polygons: list,
+        th: float,
+        clearance: object = None
+    ) -> np.ndarray:
+    #Exact test of the disc of radius th swept along each segment
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    starts, ends = np.broadcast_arrays(starts, ends)
+    collides = np.zeros(len(starts), dtype=bool)
+    if not polygons or not len(starts):
+        return collides
+    pending = np.arange(len(starts))
+    if clearance is not None:
+        free, blocked = clearance.classify_segments(starts, ends, th)
+        collides[blocked] = True
+        pending = np.flatnonzero(~(free | blocked))
+    edges = get_polygon_edges(polygons)
+    if edges.bvh is not None:
+        collides[pending] = culled_segments_collide(
+            starts[pending],
+            ends[pending],
+            edges,
             th
         )
-        for polygon in polygons
-    )
-    return any(collisions)
+        return collides
+    chunk = max(1, BATCH_SIZE//len(edges))
+    for begin in range(0, len(pending), chunk):
+        block_idxs = pending[begin: begin + chunk]
+        block_starts = starts[block_idxs]
+        sq_dists = segments_to_edges_sq_distance(
+            block_starts,
+            ends[block_idxs],
+            edges
+        )
+        #A segment not touching any edge is either inside or outside
+        collides[block_idxs] = (
+            points_inside(block_starts, edges) |
+            (sq_dists.min(axis=1) < th*th)
+        )
+    return collides
 
 
 def segment_collides(segment: Segment, polygons: list, th: float) -> bool:
     start = segment.points[0]
     goal = segment.points[1]
-    m = (goal.y - start.y)/(goal.x - start.x)
-    b = start.y - m*start.x
-    nintervals = int(segment.len()/0.01)
-    ray_xs = np.linspace(start.x, goal.x, nintervals)
-    ray_ys = m*ray_xs + b
-    possible_confs = (Point(x, y) for x, y in zip(ray_xs, ray_ys))
-    possible_collisions = (
-        point_collides(point, polygons, th)
-        for point in possible_confs
+    return bool(
+        segments_collide(
+            [start.x, start.y],
+            [goal.x, goal.y],
+            polygons,
+            th
+        )[0]
     )
-    return any(possible_collisions)
@@ -0,0 +1,179 @@
+import numpy as np
+
+
+class GrowableArray:
+    def __init__(self, shape: tuple = (), dtype: object = float) -> None:
+        self._data = np.empty((64, *shape), dtype=dtype)
+        self._count = 0
+        #Wrapped arrays (e.g. memory maps) are copied before any write
+        self._shared = False
+
+    @classmethod
+    def wrap(cls, array: np.ndarray) -> "GrowableArray":
+        growable = cls(array.shape[1:], array.dtype)
+        growable._data = array
+        growable._count = len(array)
+        growable._shared = True
+        return growable
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._data[:self._count]
+
+    def append(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=self._data.dtype)
+        values = values.reshape(-1, *self._data.shape[1:])
+        new_count = self._count + len(values)
+        if new_count > len(self._data) or self._shared:
+            capacity = max(new_count, 2*len(self._data), 64)
+            grown = np.empty((capacity, *self._data.shape[1:]), self._data.dtype)
+            grown[:self._count] = self.array
+            self._data = grown
+            self._shared = False
+        self._data[self._count: new_count] = values
+        self._count = new_count
+
+    def truncate(self, count: int) -> None:
+        self._count = min(count, self._count)
+
+    def assign(self, idxs: np.ndarray, values: np.ndarray) -> None:
+        if self._shared:
+            self._data = self.array.copy()
+            self._shared = False
+        self._data[idxs] = values
+
+
+UNKNOWN = 0
+VALID = 1
+INVALID = -1
+
+
+class EdgeBuffer:
+    def __init__(self) -> None:
+        self.rows = GrowableArray(dtype=np.int32)
+        self.cols = GrowableArray(dtype=np.int32)
+        self.weights = GrowableArray(dtype=float)
+        #Collision status, lazy roadmaps insert edges before checking them
+        self.status = GrowableArray(dtype=np.int8)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def append(
+            self,
+            rows: np.ndarray,
+            cols: np.ndarray,
+            weights: np.ndarray,
+            status: int = VALID
+        ) -> None:
+        self.rows.append(rows)
+        self.cols.append(cols)
+        self.weights.append(weights)
+        self.status.append(np.full(len(self.rows) - len(self.status), status))
+
+    @classmethod
+    def wrap(
+            cls,
+            rows: np.ndarray,
+            cols: np.ndarray,
+            weights: np.ndarray,
+            status: np.ndarray = None
+        ) -> "EdgeBuffer":
+        edges = cls()
+        edges.rows = GrowableArray.wrap(rows)
+        edges.cols = GrowableArray.wrap(cols)
+        edges.weights = GrowableArray.wrap(weights)
+        if status is None:
+            edges.status.append(np.full(len(rows), VALID))
+        else:
+            edges.status = GrowableArray.wrap(status)
+        return edges
+
+    def find(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        #Ids of the edges joining any of the given vertex pairs
+        n_vertices = max(
+            int(self.rows.array.max(initial=0)),
+            int(self.cols.array.max(initial=0)),
+            int(np.max(rows, initial=0)),
+            int(np.max(cols, initial=0))
+        ) + 1
+        keys = (
+            np.minimum(self.rows.array, self.cols.array).astype(np.int64)*n_vertices +
+            np.maximum(self.rows.array, self.cols.array)
+        )
+        pair_keys = (
+            np.minimum(rows, cols).astype(np.int64)*n_vertices +
+            np.maximum(rows, cols)
+        )
+        return np.flatnonzero(np.isin(keys, pair_keys))
+
+    def to_csr(
+            self,
+            n_vertices: int,
+            extra_rows: np.ndarray = (),
+            extra_cols: np.ndarray = (),
+            extra_weights: np.ndarray = ()
+        ) -> object:
+        from scipy.sparse import csr_array
+
+        rows, cols, weights = self.rows.array, self.cols.array, self.weights.array
+        usable = self.status.array != INVALID
+        if not usable.all():
+            rows, cols, weights = rows[usable], cols[usable], weights[usable]
+        if len(extra_rows):
+            rows = np.concatenate([rows, extra_rows])
+            cols = np.concatenate([cols, extra_cols])
+            weights = np.concatenate([weights, extra_weights])
+        #Each edge is stored once, searches must treat the graph as undirected
+        return csr_array(
+            (weights, (rows, cols)),
+            shape = (n_vertices, n_vertices)
+        )
+
+
+class DisjointSet:
+    def __init__(self) -> None:
+        self.parent = []
+        self.rank = []
+
+    @classmethod
+    def from_labels(cls, labels: np.ndarray) -> "DisjointSet":
+        _, first_idxs = np.unique(labels, return_index=True)
+        components = cls()
+        components.parent = first_idxs[labels].tolist()
+        components.rank = [0]*len(labels)
+        for root in first_idxs.tolist():
+            components.rank[root] = 1
+        return components
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def add(self, count: int = 1) -> None:
+        first_idx = len(self.parent)
+        self.parent += range(first_idx, first_idx + count)
+        self.rank += [0]*count
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return False
+        if self.rank[root_i] < self.rank[root_j]:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+        if self.rank[root_i] == self.rank[root_j]:
+            self.rank[root_i] += 1
+        return True
+
+    def connected(self, i: int, j: int) -> bool:
+        return self.find(i) == self.find(j)
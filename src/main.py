@@ -1,6 +1,8 @@
 from argparse import ArgumentParser, BooleanOptionalAction
 
 from special_scenes import PrmScene
+from samplers import SAMPLERS
+from search import SEARCHES
 
 
 def parse_args() -> object:
@@ -18,11 +20,56 @@ def parse_args() -> object:
         type = int,
         help = "FPS de la simulación"
     )
+    parser.add_argument(
+        "--budget",
+        default = 0,
+        type = float,
+        help = "Milisegundos de planificación por cuadro (0: una actualización por cuadro)"
+    )
     parser.add_argument(
         '--thopological',
         action = BooleanOptionalAction,
         help = "Utiliza un escenario topológico"
     )
+    parser.add_argument(
+        '--persistent',
+        action = BooleanOptionalAction,
+        help = "Conserva el roadmap al mover el inicio o la meta"
+    )
+    parser.add_argument(
+        '--lazy',
+        action = BooleanOptionalAction,
+        help = "Valida las aristas solo cuando forman parte del camino más corto"
+    )
+    parser.add_argument(
+        '--sampler',
+        default = "uniform",
+        choices = list(SAMPLERS),
+        help = "Estrategia de muestreo de milestones"
+    )
+    parser.add_argument(
+        '--batch',
+        default = 1,
+        type = int,
+        help = "Muestras por actualización del roadmap"
+    )
+    parser.add_argument(
+        '--search',
+        default = "astar",
+        choices = ["dijkstra", *SEARCHES],
+        help = "Búsqueda del camino más corto en el roadmap"
+    )
+    parser.add_argument(
+        '--cache',
+        default = 0,
+        type = int,
+        help = "Entradas de la caché de colisiones (0: desactivada)"
+    )
+    parser.add_argument(
+        '--stats',
+        action = BooleanOptionalAction,
+        help = "Muestra contadores y tiempos del planificador en el título"
+    )
 
     args = parser.parse_args()
     return args
@@ -36,6 +83,14 @@ def main() -> None:
         height = args.width,
         max_fps = args.fps,
         thopological = args.thopological,
+        persistent = args.persistent,
+        stats = args.stats,
+        lazy = args.lazy,
+        sampler = args.sampler,
+        batch_size = args.batch,
+        search = args.search,
+        cache_size = args.cache,
+        budget = args.budget/1000,
         background_color = 	(1.0, 1.0, 1.0, 1.0),
     )
     scene.run()
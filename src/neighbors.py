@@ -0,0 +1,164 @@
+import numpy as np
+
+from graph import GrowableArray
+
+
+class NeighborIndex:
+    def __init__(self) -> None:
+        self._points = GrowableArray((2, ))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points.array
+
+    def insert(self, points: np.ndarray) -> None:
+        self._points.append(points)
+
+    def bulk_load(self, points: np.ndarray) -> None:
+        #Indexes an existing array without copying it
+        self._points = GrowableArray.wrap(points)
+
+    def candidates(self, point: np.ndarray, radius: float, k: int) -> np.ndarray:
+        return np.arange(len(self))
+
+    def query(self, point: np.ndarray, radius: float, k: int = None) -> tuple:
+        point = np.asarray(point, dtype=float)
+        idxs = self.candidates(point, radius, k)
+        dists = np.linalg.norm(self.points[idxs] - point, axis=1)
+        near = dists < radius
+        idxs, dists = idxs[near], dists[near]
+        if k is not None and len(idxs) > k:
+            nearest = np.argpartition(dists, k - 1)[:k]
+            idxs, dists = idxs[nearest], dists[nearest]
+        order = np.argsort(dists, kind="stable")
+        return idxs[order], dists[order]
+
+
+class GridIndex(NeighborIndex):
+    def __init__(self, cell_size: float = 0.05) -> None:
+        super().__init__()
+        self.cell_size = cell_size
+        self.cells = {}
+        self.low = None
+        self.high = None
+
+    def insert(self, points: np.ndarray) -> None:
+        first_idx = len(self)
+        super().insert(points)
+        keys = np.floor(self.points[first_idx:]/self.cell_size)
+        keys = keys.astype(int)
+        if not len(keys):
+            return
+        for idx, key in enumerate(map(tuple, keys), first_idx):
+            self.cells.setdefault(key, []).append(idx)
+        low, high = keys.min(axis=0), keys.max(axis=0)
+        self.low = low if self.low is None else np.minimum(self.low, low)
+        self.high = high if self.high is None else np.maximum(self.high, high)
+
+    def bulk_load(self, points: np.ndarray) -> None:
+        super().bulk_load(points)
+        self.cells = {}
+        if not len(points):
+            return
+        keys = np.floor(points/self.cell_size).astype(int)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(
+            np.any(np.diff(sorted_keys, axis=0, prepend=sorted_keys[:1] - 1), axis=1)
+        )
+        for cell_idxs, key in zip(
+                np.split(order, starts[1:]),
+                map(tuple, sorted_keys[starts])
+            ):
+            self.cells[key] = sorted(cell_idxs.tolist())
+        self.low, self.high = keys.min(axis=0), keys.max(axis=0)
+
+    def ring_cells(self, center: np.ndarray, ring: int) -> list:
+        low = np.maximum(center - ring, self.low)
+        high = np.minimum(center + ring, self.high)
+        keys = []
+        for i in range(low[0], high[0] + 1):
+            if abs(i - center[0]) == ring:
+                keys += [(i, j) for j in range(low[1], high[1] + 1)]
+            else:
+                keys += [
+                    (i, j)
+                    for j in (center[1] - ring, center[1] + ring)
+                    if low[1] <= j <= high[1]
+                ]
+        return keys
+
+    def candidates(self, point: np.ndarray, radius: float, k: int) -> np.ndarray:
+        if not len(self):
+            return np.arange(0)
+        center = np.floor(point/self.cell_size).astype(int)
+        #Beyond the occupied cells no ring can add candidates
+        reach = np.maximum(np.abs(center - self.low), np.abs(center - self.high))
+        max_ring = min(int(np.ceil(radius/self.cell_size)), int(reach.max()))
+        idxs = []
+        for ring in range(max_ring + 1):
+            for key in self.ring_cells(center, ring):
+                idxs += self.cells.get(key, [])
+            if k is None or len(idxs) < k:
+                continue
+            #Every point closer than ring*cell_size was already visited
+            covered = ring*self.cell_size
+            dists = np.linalg.norm(self.points[idxs] - point, axis=1)
+            if np.count_nonzero(dists < min(covered, radius)) >= k:
+                break
+        return np.array(idxs, dtype=int)
+
+
+class KDTreeIndex(NeighborIndex):
+    def __init__(self, rebuild_ratio: float = 0.25, min_rebuild: int = 64) -> None:
+        super().__init__()
+        self.rebuild_ratio = rebuild_ratio
+        self.min_rebuild = min_rebuild
+        self.tree = None
+        self.tree_size = 0
+
+    def insert(self, points: np.ndarray) -> None:
+        super().insert(points)
+        pending = len(self) - self.tree_size
+        if pending > max(self.min_rebuild, self.rebuild_ratio*self.tree_size):
+            self.rebuild()
+
+    def bulk_load(self, points: np.ndarray) -> None:
+        super().bulk_load(points)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        from scipy.spatial import cKDTree
+
+        self.tree = cKDTree(self.points) if len(self) else None
+        self.tree_size = len(self)
+
+    def candidates(self, point: np.ndarray, radius: float, k: int) -> np.ndarray:
+        pending = np.arange(self.tree_size, len(self))
+        if self.tree is None:
+            return pending
+        if k is None:
+            in_tree = self.tree.query_ball_point(point, radius)
+        else:
+            dists, in_tree = self.tree.query(
+                point,
+                k = min(k, self.tree_size),
+                distance_upper_bound = radius
+            )
+            in_tree = np.atleast_1d(in_tree)[np.isfinite(np.atleast_1d(dists))]
+        return np.concatenate([np.asarray(in_tree, dtype=int), pending])
+
+
+INDEXES = {
+    "brute": NeighborIndex,
+    "grid": GridIndex,
+    "kdtree": KDTreeIndex,
+}
+
+def make_index(kind: str = "grid", **kwargs) -> NeighborIndex:
+    if kind not in INDEXES:
+        raise RuntimeError(f"Unknown neighbor index: {kind}")
+    return INDEXES[kind](**kwargs)
@@ -1,10 +1,22 @@
+import json
+import os
+
 import numpy as np
-from scipy.sparse import csr_array
-from scipy.sparse.csgraph import dijkstra
 
-from scene.scenes import Point
-from shapes import Segment, Path, Circle
+from scene.geometry import Point
+from shapes import Segment, Path, Polygon
 import collisions
+import neighbors
+import samplers
+from graph import GrowableArray, EdgeBuffer, DisjointSet, UNKNOWN, VALID, INVALID
+from validation import EdgeValidator
+from clearance import get_clearance_grid
+from stats import PlannerStats
+from search import Adjacency, SEARCHES, query_edges
+
+
+def boxes_overlap(lows: np.ndarray, highs: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    return np.all((lows <= high) & (highs >= low), axis=1)
 
 
 class IndexedSegment(Segment):
@@ -27,104 +39,504 @@ class ProbabilisticRandomMap:
             radius: float,
             start: Point,
             goal: Point,
+            neighbor_index: str = "grid",
+            persistent: bool = False,
+            workers: int = 0,
+            clearance_resolution: int = None,
+            stats: bool = False,
+            lazy: bool = False,
+            sampler: str = "uniform",
+            seed: int = None,
+            search: str = "astar",
+            cache: object = None,
         ) -> None:
-        self.polygons = polygons
+        self.telemetry = PlannerStats(stats)
+        #Lazy roadmaps only check the edges of candidate shortest paths
+        self.lazy = lazy
         self.radius = radius
+        self.neighbor_index = neighbor_index
+        self.sampler = samplers.make_sampler(
+            sampler,
+            seed = seed,
+            collides = self.points_collide
+        )
+        if search != "dijkstra" and search not in SEARCHES:
+            raise RuntimeError(f"Unknown search: {search}")
+        self.search_method = search
+        self.workers = workers
+        self.clearance_resolution = clearance_resolution
+        #The collision cache outlives resets, and may be shared between planners
+        self.cache = cache
+        self.validator = None
+        self.set_polygons(polygons)
+        #A persistent roadmap only holds samples and survives every reset
+        self.persistent = persistent
+        self.revision = 0
+        self.renderer = None
+        self.clear()
         self.reset(start, goal)
 
+    def set_polygons(self, polygons: list) -> None:
+        self.polygons = polygons
+        self.stamp = collisions.polygons_hash(polygons)
+        self.clearance = None
+        if self.clearance_resolution:
+            self.clearance = get_clearance_grid(polygons, self.clearance_resolution)
+        if self.validator is not None:
+            self.validator.close()
+        self.validator = EdgeValidator(
+            polygons,
+            self.radius,
+            self.workers,
+            clearance = self.clearance,
+            cache = self.cache
+        )
+
+    def clear(self) -> None:
+        self.revision += 1
+        self.milestones = GrowableArray((2, ))
+        self.edges = EdgeBuffer()
+        self.index = neighbors.make_index(self.neighbor_index)
+        self.components = DisjointSet()
+        self.adjacency = None
+        self.adjacency_key = None
+
     def reset(self, start: Point, goal: Point) -> None:
-        self.milestones = [start, goal]
-        self.edges = []
-        self.connect([goal], 10.0)
+        self.start = start
+        self.goal = goal
         self.path_exists = False
         self.cost = np.inf
         self.last_cost = np.inf
+        if self.persistent:
+            self.shortest_path = self.query(start, goal)
+            return
+        self.clear()
+        self.milestones.append([[start.x, start.y], [goal.x, goal.y]])
+        self.index.insert(self.milestones.array[0])
+        self.components.add(1)
+        self.connect(self.milestones.array[1:], 10.0)
         self.shortest_path = self.get_shortest_path()
 
-    def sample(self, ntries: int = 5) -> list:
-        milestones_candidates = [
-            Point(*array)
-            for array in np.random.uniform(-1, 1, (ntries, 2))
-        ]
-        new_milestones = [
-            new_milestone
-            for new_milestone in milestones_candidates
-            if not collisions.point_collides(
-                new_milestone,
+    def save(self, path: str) -> None:
+        #A directory of .npy files that np.load can memory map
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "milestones": self.milestones.array,
+            "rows": self.edges.rows.array,
+            "cols": self.edges.cols.array,
+            "weights": self.edges.weights.array,
+            "status": self.edges.status.array,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        meta = {
+            "radius": self.radius,
+            "polygons": self.stamp,
+            "persistent": self.persistent,
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def load(self, path: str, mmap_mode: str = "r") -> None:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["radius"] != self.radius:
+            raise RuntimeError(
+                f"Roadmap was built for radius {meta['radius']}, not {self.radius}"
+            )
+        if meta["polygons"] != self.stamp:
+            raise RuntimeError("Roadmap was built for a different polygon set")
+
+        def load_array(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        self.persistent = meta["persistent"]
+        has_status = os.path.exists(os.path.join(path, "status.npy"))
+        self.adopt(
+            load_array("milestones"),
+            EdgeBuffer.wrap(
+                load_array("rows"),
+                load_array("cols"),
+                load_array("weights"),
+                load_array("status") if has_status else None
+            )
+        )
+        if self.persistent:
+            self.reset(self.start, self.goal)
+            return
+        #Milestones 0 and 1 are the start and goal the roadmap was built for
+        self.start, self.goal = self.milestone(0), self.milestone(1)
+        self.path_exists = False
+        self.cost = np.inf
+        self.last_cost = np.inf
+        self.shortest_path = self.get_shortest_path()
+
+    def adopt(self, milestones: np.ndarray, edges: EdgeBuffer) -> None:
+        self.clear()
+        self.milestones = GrowableArray.wrap(milestones)
+        self.edges = edges
+        self.index.bulk_load(milestones)
+        self.components = self.get_components()
+
+    def add_polygon(self, polygon: Polygon, th: float = 0.5, samples: int = 20) -> None:
+        self.repair(self.polygons + [polygon], [polygon], [], th, samples)
+
+    def remove_polygon(self, idx: int, th: float = 0.5, samples: int = 20) -> None:
+        polygon = self.polygons[idx]
+        polygons = self.polygons[:idx] + self.polygons[idx + 1:]
+        self.repair(polygons, [], [polygon], th, samples)
+
+    def move_polygon(
+            self,
+            idx: int,
+            dx: float,
+            dy: float,
+            th: float = 0.5,
+            samples: int = 20
+        ) -> None:
+        polygon = self.polygons[idx]
+        moved = Polygon((polygon.vertices + (dx, dy)).tolist())
+        polygons = list(self.polygons)
+        polygons[idx] = moved
+        self.repair(polygons, [moved], [polygon], th, samples)
+
+    def repair(
+            self,
+            polygons: list,
+            added: list,
+            removed: list,
+            th: float,
+            samples: int
+        ) -> None:
+        #Only milestones and edges near the changed obstacles are checked again
+        with self.telemetry.timer("repair"):
+            self.set_polygons(polygons)
+            milestones = self.milestones.array
+            rows, cols = self.edges.rows.array, self.edges.cols.array
+            edge_lows = np.minimum(milestones[rows], milestones[cols])
+            edge_highs = np.maximum(milestones[rows], milestones[cols])
+            status = self.edges.status.array.copy()
+
+            #Lazy roadmaps check again the edges an old obstacle had blocked
+            for polygon in removed:
+                low, high = polygon.inflated_bounds(self.radius)
+                freed = boxes_overlap(edge_lows, edge_highs, low, high)
+                status[freed & (status == INVALID)] = UNKNOWN
+
+            keep = np.ones(len(milestones), dtype=bool)
+            stale = np.zeros(len(rows), dtype=bool)
+            for polygon in added:
+                low, high = polygon.inflated_bounds(self.radius)
+                near = np.flatnonzero(boxes_overlap(milestones, milestones, low, high))
+                keep[near[self.points_collide(milestones[near])]] = False
+                stale |= boxes_overlap(edge_lows, edge_highs, low, high)
+            if not self.persistent:
+                #Start and goal stay, their edges alone are dropped
+                keep[:2] = True
+            edge_keep = keep[rows] & keep[cols]
+            #Even lazy roadmaps check the region now, a new obstacle would
+            #otherwise fail one candidate path after another
+            stale = np.flatnonzero(stale & edge_keep & (status != INVALID))
+            collides = self.validator(milestones[rows[stale]], milestones[cols[stale]])
+            self.telemetry.count("collision_checks", len(stale))
+            status[stale] = VALID
+            edge_keep[stale[collides]] = False
+
+            #Milestones keep their order, edges are renumbered to match
+            new_idxs = np.cumsum(keep) - 1
+            self.adopt(
+                milestones[keep],
+                EdgeBuffer.wrap(
+                    new_idxs[rows[edge_keep]].astype(rows.dtype),
+                    new_idxs[cols[edge_keep]].astype(cols.dtype),
+                    self.edges.weights.array[edge_keep],
+                    status[edge_keep]
+                )
+            )
+            #Space freed by an obstacle may need milestones of its own
+            for polygon in removed:
+                self.resample(*polygon.inflated_bounds(self.radius), samples, th)
+        self.telemetry.count("milestones_removed", np.count_nonzero(~keep))
+        self.telemetry.count("edges_removed", np.count_nonzero(~edge_keep))
+
+        self.path_exists = False
+        self.cost = np.inf
+        self.last_cost = np.inf
+        if self.persistent:
+            self.shortest_path = self.query(self.start, self.goal, th)
+        else:
+            self.shortest_path = self.get_shortest_path()
+
+    def resample(self, low: np.ndarray, high: np.ndarray, samples: int, th: float) -> None:
+        low, high = np.maximum(low, -1), np.minimum(high, 1)
+        candidates = low + (high - low)*self.sampler.unit(samples)
+        new_milestones = candidates[~self.points_collide(candidates)]
+        self.milestones.append(new_milestones)
+        self.connect(new_milestones, th)
+
+    def get_components(self) -> DisjointSet:
+        from scipy.sparse.csgraph import connected_components
+
+        _, labels = connected_components(self.get_matrix(), directed=False)
+        return DisjointSet.from_labels(labels)
+
+    def milestone(self, idx: int) -> Point:
+        return Point(*self.milestones.array[idx])
+
+    def edge(self, idx: int) -> IndexedSegment:
+        pi_idx = self.edges.rows.array[idx]
+        pj_idx = self.edges.cols.array[idx]
+        return IndexedSegment(
+            self.milestone(pi_idx),
+            self.milestone(pj_idx),
+            pi_idx,
+            pj_idx
+        )
+
+    def stats(self) -> dict:
+        stats = self.telemetry.snapshot()
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def points_collide(self, points: np.ndarray) -> np.ndarray:
+        if self.cache is None:
+            return collisions.points_collide(
+                points,
                 self.polygons,
-                self.radius
+                self.radius,
+                self.clearance
             )
-        ]
-        self.milestones += new_milestones
+        keys = self.cache.point_keys(points, self.radius, self.stamp)
+        return self.cache.lookup(
+            keys,
+            lambda idxs: collisions.points_collide(
+                points[idxs],
+                self.polygons,
+                self.radius,
+                self.clearance
+            )
+        )
+
+    def sample(self, ntries: int = 5) -> np.ndarray:
+        with self.telemetry.timer("sampling"):
+            milestones_candidates = self.sampler.draw(ntries)
+            if self.sampler.returns_free:
+                new_milestones = milestones_candidates
+            else:
+                free = ~self.points_collide(milestones_candidates)
+                new_milestones = milestones_candidates[free]
+            self.milestones.append(new_milestones)
+        self.telemetry.count("samples_drawn", ntries)
+        self.telemetry.count("samples_rejected", ntries - len(new_milestones))
         return new_milestones
 
-    def connect(self, new_milestones: list, th: float, max_nn: int = 20) -> None:
-        new_edges = []
-        last_processed_idx = len(self.milestones) - len(new_milestones)
-        for vi, v in enumerate(new_milestones):
-            all_segments = (
-                IndexedSegment(u, v, ui, last_processed_idx+vi)
-                for ui, u in enumerate(self.milestones)
-                if u != v
-            )
-            near_segments = (
-                segment
-                for segment in all_segments
-                if segment.len() < th
+    def free_neighbors(
+            self,
+            point: np.ndarray,
+            th: float,
+            max_nn: int
+        ) -> tuple:
+        near_idxs, near_dists = self.index.query(point, th, max_nn)
+        if not len(near_idxs):
+            return near_idxs, near_dists
+        free = ~self.validator(self.milestones.array[near_idxs], point)
+        self.telemetry.count("collision_checks", len(near_idxs))
+        return near_idxs[free], near_dists[free]
+
+    def connect(
+            self,
+            new_milestones: np.ndarray,
+            th: float,
+            max_nn: int = 20
+        ) -> None:
+        with self.telemetry.timer("connection"):
+            last_processed_idx = len(self.milestones) - len(new_milestones)
+            candidates = []
+            for v in new_milestones:
+                #The index holds every milestone before v
+                candidates.append(self.index.query(v, th, max_nn))
+                self.index.insert(v)
+            self.components.add(len(new_milestones))
+            if not candidates:
+                return
+
+            near_idxs = np.concatenate([idxs for idxs, _ in candidates])
+            near_dists = np.concatenate([dists for _, dists in candidates])
+            v_idxs = np.repeat(
+                np.arange(last_processed_idx, len(self.milestones)),
+                [len(idxs) for idxs, _ in candidates]
             )
-            near_segments = sorted(near_segments, key=lambda x: x.len())
-            collision_free_segments = (
-                segment
-                for segment in near_segments[:max_nn]
-                if not collisions.segment_collides(
-                    segment,
-                    self.polygons,
-                    self.radius
+            if self.lazy:
+                free = np.ones(len(near_idxs), dtype=bool)
+            else:
+                free = ~self.validator(
+                    self.milestones.array[near_idxs],
+                    self.milestones.array[v_idxs]
                 )
+            self.edges.append(
+                near_idxs[free],
+                v_idxs[free],
+                near_dists[free],
+                UNKNOWN if self.lazy else VALID
             )
-            new_edges += list(collision_free_segments)
-        self.edges += new_edges
+            #Unchecked edges make the components an over-approximation,
+            #still enough to skip searches that cannot succeed
+            for ui, vi in zip(near_idxs[free].tolist(), v_idxs[free].tolist()):
+                self.components.union(ui, vi)
+        self.telemetry.count("candidate_neighbors", len(near_idxs))
+        if not self.lazy:
+            self.telemetry.count("collision_checks", len(near_idxs))
+        self.telemetry.count("edges_accepted", np.count_nonzero(free))
 
-    def update(self, th: float = 0.5, max_milestones: int = 200) -> bool:
+    def update(
+            self,
+            th: float = 0.5,
+            max_milestones: int = 200,
+            batch_size: int = 1
+        ) -> bool:
         not_finished = True
         if self.path_exists or len(self.milestones) > max_milestones + 1:
             not_finished = False
-        new_milestones = self.sample(1)
+        n_edges = len(self.edges)
+        new_milestones = self.sample(batch_size)
         self.connect(new_milestones, th)
-        self.shortest_path = self.get_shortest_path()
+        #Only new edges can create or shorten a path
+        if len(self.edges) > n_edges:
+            if self.persistent:
+                self.shortest_path = self.query(self.start, self.goal, th)
+            else:
+                self.shortest_path = self.get_shortest_path()
 
         return not_finished
 
-    def get_matrix(self) -> np.ndarray:
-        n = len(self.milestones)
-        matrix = -np.ones((n, n))
-        for indexed_edge in self.edges:
-            distance = indexed_edge.len()
-            matrix[indexed_edge.pi_idx, indexed_edge.pj_idx] = distance
-            matrix[indexed_edge.pj_idx, indexed_edge.pi_idx] = distance
-        return matrix
-
-    def get_shortest_path(self) -> object:
-        matrix = self.get_matrix()
-        graph = csr_array(matrix)
-        graph[graph < 0] = np.inf
-
-        i = 0
-        j = 1
-
-        dist_matrix, predecessors = dijkstra(
-            csgraph=graph,
-            directed=False,
-            indices = i,
-            return_predecessors=True
+    def get_matrix(self) -> object:
+        return self.edges.to_csr(len(self.milestones))
+
+    def query(
+            self,
+            start: Point,
+            goal: Point,
+            th: float = 0.5,
+            max_nn: int = 20
+        ) -> object:
+        #Start and goal become temporary vertices n and n + 1, the roadmap
+        #buffers are left untouched so they can be shared or memory mapped
+        n_milestones = len(self.milestones)
+        endpoints = np.array([[start.x, start.y], [goal.x, goal.y]])
+        self.last_cost = self.cost
+        extra_edges = query_edges(
+            endpoints,
+            n_milestones,
+            lambda point: self.free_neighbors(point, th, max_nn),
+            self.components.find,
+            self.validator
         )
+        if extra_edges is None:
+            self.telemetry.count("searches_skipped")
+            self.cost = np.inf
+            return
+        return self.search(n_milestones, n_milestones + 1, extra_edges, endpoints)
+
+    def query_many(
+            self,
+            starts: np.ndarray,
+            goals: np.ndarray,
+            th: float = 0.5,
+            max_nn: int = 20
+        ) -> list:
+        #Answers many queries in one call, returning a (cost, path) pair per
+        #query; the searches share the cached adjacency and the planner's
+        #own path is left as is
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        goals = np.asarray(goals, dtype=float).reshape(-1, 2)
+        cost, last_cost, path_exists = self.cost, self.last_cost, self.path_exists
+        results = []
+        try:
+            for start, goal in zip(starts, goals):
+                path = self.query(Point(*start), Point(*goal), th, max_nn)
+                results.append((float(self.cost), path))
+        finally:
+            self.cost, self.last_cost, self.path_exists = cost, last_cost, path_exists
+        return results
 
+    def get_shortest_path(self, i: int = 0, j: int = 1) -> object:
         self.last_cost = self.cost
-        self.cost = dist_matrix[j]
-        if dist_matrix[j] == np.inf:
+        if not self.components.connected(i, j):
+            self.telemetry.count("searches_skipped")
+            self.cost = np.inf
             return
+        return self.search(i, j)
+
+    def get_adjacency(self) -> Adjacency:
+        #Rebuilt only when the roadmap changed since the last search
+        key = (self.revision, len(self.milestones), len(self.edges))
+        if self.adjacency_key != key:
+            self.adjacency = Adjacency(self.get_matrix(), self.milestones.array)
+            self.adjacency_key = key
+        return self.adjacency
+
+    def search(
+            self,
+            i: int,
+            j: int,
+            extra_edges: tuple = ((), (), ()),
+            extra_points: np.ndarray = None
+        ) -> object:
+        n_milestones = len(self.milestones)
+        while True:
+            self.telemetry.count("searches")
+            if self.search_method == "dijkstra":
+                cost, path = self.dijkstra(i, j, extra_edges, extra_points)
+            else:
+                with self.telemetry.timer("matrix"):
+                    adjacency = self.get_adjacency().with_extra(extra_edges, extra_points)
+                with self.telemetry.timer(self.search_method):
+                    cost, path, expanded = SEARCHES[self.search_method](adjacency, i, j)
+                self.telemetry.count("vertices_expanded", expanded)
+
+            self.cost = cost
+            if cost == np.inf:
+                return
+            if not self.lazy or self.validate_path(path):
+                break
 
         self.path_exists = True
+        #Searches trace paths from j back to i, the Path runs from i to j
+        vertices_path = [
+            self.milestone(vertex_i)
+            if vertex_i < n_milestones
+            else Point(*extra_points[vertex_i - n_milestones])
+            for vertex_i in reversed(path)
+        ]
+
+        return Path(vertices_path)
+
+    def dijkstra(
+            self,
+            i: int,
+            j: int,
+            extra_edges: tuple = ((), (), ()),
+            extra_points: np.ndarray = None
+        ) -> tuple:
+        from scipy.sparse.csgraph import dijkstra
+
+        n_vertices = len(self.milestones)
+        if extra_points is not None:
+            n_vertices += len(extra_points)
+        with self.telemetry.timer("matrix"):
+            graph = self.edges.to_csr(n_vertices, *extra_edges)
+        with self.telemetry.timer("dijkstra"):
+            dist_matrix, predecessors = dijkstra(
+                csgraph=graph,
+                directed=False,
+                indices = i,
+                return_predecessors=True
+            )
+
+        if dist_matrix[j] == np.inf:
+            return np.inf, []
+
         path = []
 
         current = j
@@ -132,19 +544,53 @@ class ProbabilisticRandomMap:
             path.append(current)
             current = predecessors[current]
         path.append(current)
+        return dist_matrix[j], path
 
-        vertices_path = [self.milestones[vertex_i] for vertex_i in path]
+    def validate_path(self, path: list) -> bool:
+        #Checks the unknown roadmap edges of a path, caching the result
+        path = np.array(path)
+        n_milestones = len(self.milestones)
+        in_roadmap = (path[:-1] < n_milestones) & (path[1:] < n_milestones)
+        edge_idxs = self.edges.find(path[:-1][in_roadmap], path[1:][in_roadmap])
+        edge_idxs = edge_idxs[self.edges.status.array[edge_idxs] == UNKNOWN]
+        if not len(edge_idxs):
+            return True
+        rows = self.edges.rows.array[edge_idxs]
+        cols = self.edges.cols.array[edge_idxs]
+        collides = self.validator(
+            self.milestones.array[rows],
+            self.milestones.array[cols]
+        )
+        self.telemetry.count("collision_checks", len(edge_idxs))
+        self.edges.status.assign(edge_idxs, np.where(collides, INVALID, VALID))
+        if not collides.any():
+            return True
+        self.telemetry.count("edges_invalidated", np.count_nonzero(collides))
+        up_to_date = self.adjacency_key == (
+            self.revision, len(self.milestones), len(self.edges)
+        )
+        self.revision += 1
+        if up_to_date:
+            #Cheaper than rebuilding the adjacency after every failed path
+            self.adjacency.remove_edges(rows[collides], cols[collides])
+            self.adjacency_key = (self.revision, len(self.milestones), len(self.edges))
+        return False
 
-        return Path(vertices_path)
+    def close(self) -> None:
+        self.validator.close()
 
     def draw(self) -> None:
-        for segment in self.edges:
-            segment.draw(color = (1.0, 0.8, 0.5, 1.0))
+        if self.renderer is None:
+            from renderer import RoadmapRenderer
+            self.renderer = RoadmapRenderer()
+        self.renderer.sync(self)
+        self.renderer.draw_edges(color = (1.0, 0.8, 0.5, 1.0))
         if self.shortest_path:
             self.shortest_path.draw(color = (1.0, 0, 0, 1.0))
-        for milestone in self.milestones:
-            vertex = Circle(milestone, 0.015)
-            vertex.draw(color = (220/255, 88/255, 88/255, 1.0))
+        self.renderer.draw_milestones(
+            color = (220/255, 88/255, 88/255, 1.0),
+            radius = 0.015
+        )
 
     def finished(self) -> bool:
         return self.cost != np.inf
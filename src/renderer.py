@@ -0,0 +1,91 @@
+from OpenGL.GL import *
+import numpy as np
+
+from graph import GrowableArray, INVALID
+
+
+class VertexBuffer:
+    def __init__(self) -> None:
+        self.vbo = glGenBuffers(1)
+        self.capacity = 0
+        #CPU mirror, needed to refill the buffer when it has to grow
+        self.vertices = GrowableArray((2, ), np.float32)
+
+    def __len__(self) -> int:
+        return len(self.vertices)
+
+    def clear(self) -> None:
+        self.vertices.truncate(0)
+
+    def append(self, vertices: np.ndarray) -> None:
+        first_idx = len(self.vertices)
+        self.vertices.append(vertices)
+        if not len(vertices):
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        if len(self.vertices) > self.capacity:
+            self.capacity = max(len(self.vertices), 2*self.capacity, 1024)
+            glBufferData(
+                GL_ARRAY_BUFFER,
+                self.capacity*2*4,
+                None,
+                GL_DYNAMIC_DRAW
+            )
+            first_idx = 0
+        new_vertices = np.ascontiguousarray(self.vertices.array[first_idx:])
+        glBufferSubData(
+            GL_ARRAY_BUFFER,
+            first_idx*2*4,
+            new_vertices.nbytes,
+            new_vertices
+        )
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, mode: int) -> None:
+        if not len(self):
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, None)
+        glDrawArrays(mode, 0, len(self))
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+
+class RoadmapRenderer:
+    def __init__(self) -> None:
+        self.edges = VertexBuffer()
+        self.milestones = VertexBuffer()
+        self.revision = None
+        self.synced_edges = 0
+
+    def sync(self, prm: object) -> None:
+        #Roadmaps only grow between revisions, upload just the new geometry
+        if prm.revision != self.revision or len(self.milestones) > len(prm.milestones):
+            self.edges.clear()
+            self.milestones.clear()
+            self.revision = prm.revision
+            self.synced_edges = 0
+        #Edges found in collision by a lazy roadmap are not drawn
+        drawn = prm.edges.status.array[self.synced_edges:] != INVALID
+        rows = prm.edges.rows.array[self.synced_edges:][drawn]
+        cols = prm.edges.cols.array[self.synced_edges:][drawn]
+        self.synced_edges = len(prm.edges)
+        vertices = np.empty((2*len(rows), 2), dtype=np.float32)
+        vertices[0::2] = prm.milestones.array[rows]
+        vertices[1::2] = prm.milestones.array[cols]
+        self.edges.append(vertices)
+        self.milestones.append(prm.milestones.array[len(self.milestones):])
+
+    def draw_edges(self, color: tuple) -> None:
+        glColor(*color)
+        self.edges.draw(GL_LINES)
+
+    def draw_milestones(self, color: tuple, radius: float) -> None:
+        #Round point sprites with the same size as a circle of `radius`
+        _, _, width, _ = glGetIntegerv(GL_VIEWPORT)
+        glEnable(GL_POINT_SMOOTH)
+        glPointSize(max(1.0, radius*width))
+        glColor(*color)
+        self.milestones.draw(GL_POINTS)
+        glDisable(GL_POINT_SMOOTH)
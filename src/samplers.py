@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class UniformSampler:
+    #Samplers that check collisions themselves only return free points
+    returns_free = False
+
+    def __init__(
+            self,
+            seed: int = None,
+            low: float = -1,
+            high: float = 1,
+            collides: object = None
+        ) -> None:
+        #Without a seed the global numpy state is used, so np.random.seed
+        #still reproduces a whole run
+        self.rng = np.random if seed is None else np.random.default_rng(seed)
+        self.low = low
+        self.high = high
+        self.collides = collides
+
+    def unit(self, n: int) -> np.ndarray:
+        return self.rng.uniform(0, 1, (n, 2))
+
+    def draw(self, n: int) -> np.ndarray:
+        return self.low + (self.high - self.low)*self.unit(n)
+
+
+class HaltonSampler(UniformSampler):
+    def __init__(
+            self,
+            seed: int = None,
+            low: float = -1,
+            high: float = 1,
+            collides: object = None
+        ) -> None:
+        from scipy.stats import qmc
+
+        super().__init__(seed, low, high, collides)
+        self.engine = qmc.Halton(2, scramble = True, seed = seed)
+
+    def unit(self, n: int) -> np.ndarray:
+        return self.engine.random(n)
+
+
+class SobolSampler(UniformSampler):
+    def __init__(
+            self,
+            seed: int = None,
+            low: float = -1,
+            high: float = 1,
+            collides: object = None
+        ) -> None:
+        from scipy.stats import qmc
+
+        super().__init__(seed, low, high, collides)
+        self.engine = qmc.Sobol(2, scramble = True, seed = seed)
+        self.pending = np.zeros((0, 2))
+
+    def unit(self, n: int) -> np.ndarray:
+        #Sobol points keep their balance only in blocks of 2**m, each block
+        #as large as everything drawn before it
+        while len(self.pending) < n:
+            drawn = self.engine.num_generated
+            m = int(np.log2(drawn)) if drawn else int(np.ceil(np.log2(max(n, 1))))
+            self.pending = np.concatenate([self.pending, self.engine.random_base2(m)])
+        points, self.pending = self.pending[:n], self.pending[n:]
+        return points
+
+
+class NarrowPassageSampler(UniformSampler, ABC):
+    returns_free = True
+
+    def __init__(
+            self,
+            seed: int = None,
+            low: float = -1,
+            high: float = 1,
+            collides: object = None,
+            sigma: float = 0.05,
+            uniform_ratio: float = 0.2
+        ) -> None:
+        if collides is None:
+            raise RuntimeError(f"{type(self).__name__} needs a collision check")
+        super().__init__(seed, low, high, collides)
+        self.sigma = sigma
+        #A share of uniform samples keeps the open space connected
+        self.uniform_ratio = uniform_ratio
+
+    def uniform(self, n: int) -> np.ndarray:
+        return UniformSampler.draw(self, n)
+
+    def near(self, points: np.ndarray) -> np.ndarray:
+        return points + self.rng.normal(0, self.sigma, points.shape)
+
+    def inside(self, points: np.ndarray) -> np.ndarray:
+        return np.all((points >= self.low) & (points <= self.high), axis=1)
+
+    def draw(self, n: int) -> np.ndarray:
+        n_uniform = np.count_nonzero(self.unit(n)[:, 0] < self.uniform_ratio)
+        uniform = self.uniform(n_uniform)
+        uniform = uniform[~self.collides(uniform)]
+        return np.concatenate([uniform, self.narrow(n - n_uniform)])
+
+    @abstractmethod
+    def narrow(self, n: int) -> np.ndarray:
+        #Free samples close to obstacle boundaries
+        pass
+
+
+class GaussianSampler(NarrowPassageSampler):
+    def narrow(self, n: int) -> np.ndarray:
+        #Keeps the free point of pairs with exactly one point in collision
+        firsts = self.uniform(n)
+        seconds = self.near(firsts)
+        inside = self.inside(seconds)
+        firsts, seconds = firsts[inside], seconds[inside]
+        collides = self.collides(np.concatenate([firsts, seconds]))
+        first_collides, second_collides = collides[:len(firsts)], collides[len(firsts):]
+        return np.concatenate([
+            firsts[~first_collides & second_collides],
+            seconds[first_collides & ~second_collides],
+        ])
+
+
+class BridgeSampler(NarrowPassageSampler):
+    def narrow(self, n: int) -> np.ndarray:
+        #Free midpoints of short segments whose ends are both in collision
+        firsts = self.uniform(n)
+        firsts = firsts[self.collides(firsts)]
+        seconds = self.near(firsts)
+        inside = self.inside(seconds)
+        firsts, seconds = firsts[inside], seconds[inside]
+        bridges = self.collides(seconds)
+        middles = (firsts[bridges] + seconds[bridges])/2
+        return middles[~self.collides(middles)]
+
+
+class ObstacleSampler(NarrowPassageSampler):
+    def __init__(
+            self,
+            seed: int = None,
+            low: float = -1,
+            high: float = 1,
+            collides: object = None,
+            sigma: float = 0.05,
+            uniform_ratio: float = 0.2,
+            steps: int = 8
+        ) -> None:
+        super().__init__(seed, low, high, collides, sigma, uniform_ratio)
+        self.steps = steps
+
+    def narrow(self, n: int) -> np.ndarray:
+        #Walks away from points in collision until the first free one
+        origins = self.uniform(n)
+        origins = origins[self.collides(origins)]
+        angles = 2*np.pi*self.unit(len(origins))[:, 0]
+        directions = np.column_stack([np.cos(angles), np.sin(angles)])
+        distances = np.linspace(0, 2*self.sigma, self.steps + 1)[1:]
+        walks = origins[:, None] + directions[:, None]*distances[None, :, None]
+        valid = self.inside(walks.reshape(-1, 2)).reshape(len(origins), self.steps)
+        free = valid & ~self.collides(walks.reshape(-1, 2)).reshape(valid.shape)
+        found = free.any(axis=1)
+        return walks[found, np.argmax(free[found], axis=1)]
+
+
+SAMPLERS = {
+    "uniform": UniformSampler,
+    "halton": HaltonSampler,
+    "sobol": SobolSampler,
+    "gaussian": GaussianSampler,
+    "bridge": BridgeSampler,
+    "obstacle": ObstacleSampler,
+}
+
+def make_sampler(kind: str = "uniform", **kwargs) -> UniformSampler:
+    if kind not in SAMPLERS:
+        raise RuntimeError(f"Unknown sampler: {kind}")
+    return SAMPLERS[kind](**kwargs)
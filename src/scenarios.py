@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+from shapes import Polygon
+
+
+default_polygons = [
+    Polygon([[-0.8, 0.2], [-0.6, 0.6], [-0.5, 0.4], [-0.15, 0.27]]),
+    Polygon([[-0.5, -0.6], [-0.8, -0.6], [-0.2, -0.4], [-0.46, -0.92]]),
+    Polygon([[0.33, -0.12], [0, -0.2], [0.2, 0.2], [0.4, 0.04], [0.8, 0.2], [0.62, -0.27]])
+]
+
+patologycal_grid = [
+    Polygon([[-0.8, -0.4], [-0.75, 0.4], [-0.45, 0.4], [-0.4, -0.4]]),
+    Polygon([[-0.15, -0.4], [-0.2, 0.4], [0.2, 0.4], [0.15, -0.4]]),
+    Polygon([[0.4, -0.4], [0.45, 0.4], [0.75, 0.4], [0.8, -0.4]]),
+]
+
+#A wall whose only opening is slightly wider than the robot
+narrow_passage = [
+    Polygon([[-0.1, -1.0], [0.1, -1.0], [0.1, 0.45], [-0.1, 0.45]]),
+    Polygon([[-0.1, 0.55], [0.1, 0.55], [0.1, 1.0], [-0.1, 1.0]]),
+]
+
+SCENES = {
+    "default_polygons": default_polygons,
+    "patologycal_grid": patologycal_grid,
+    "narrow_passage": narrow_passage,
+}
+
+
+def synthetic_polygons(n_polygons: int, seed: int = 0, fill: float = 0.3) -> list:
+    #Random star-shaped polygons covering about `fill` of the workspace
+    rng = np.random.default_rng(seed)
+    size = np.sqrt(4*fill/n_polygons/np.pi)
+    polygons = []
+    for center in rng.uniform(-1, 1, (n_polygons, 2)):
+        n_vertices = rng.integers(3, 8)
+        angles = np.sort(rng.uniform(0, 2*np.pi, n_vertices))
+        radii = size*rng.uniform(0.5, 1.5, n_vertices)
+        vertices = center + np.column_stack([np.cos(angles), np.sin(angles)])*radii[:, None]
+        polygons.append(Polygon(vertices.tolist()))
+    return polygons
+
+
+def load_polygons(scene: str) -> list:
+    #A known scene name or a JSON file with a list of polygons [[x, y], ...]
+    if scene in SCENES:
+        return SCENES[scene]
+    with open(scene) as f:
+        return [Polygon(points) for points in json.load(f)]
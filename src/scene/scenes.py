@@ -6,17 +6,8 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
 
+from scene.geometry import Point
 
-class Point:
-    def __init__(self, x: int, y: int) -> None:
-        self.x = x
-        self.y = y
-
-    def __eq__(self, other: object) -> bool:
-        return self.x == other.x and self.y == other.y
-
-    def __str__(self) -> str:
-        return f"(x:{self.x}, y:{self.y})"
 
 class Line:
     def __init__(self) -> None:
@@ -79,10 +70,11 @@ class Scene:
             self.render()
 
             pygame.display.flip()
-            pygame.display.set_caption(
-                f"{self.title} ({self.clock.get_fps():.2f} fps)"
-            )
-    
+            pygame.display.set_caption(self.caption())
+
+    def caption(self) -> str:
+        return f"{self.title} ({self.clock.get_fps():.2f} fps)"
+
     def setup(self) -> None:
         GLUtils.init_ortho(-1, 1, 1, -1)
 
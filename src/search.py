@@ -0,0 +1,203 @@
+import heapq
+from itertools import chain
+import math
+
+import numpy as np
+
+
+class Adjacency:
+    def __init__(self, graph: object, points: np.ndarray) -> None:
+        #The roadmap stores each edge once, searches walk both directions
+        graph = graph.maximum(graph.T).tocsr()
+        self.n_vertices = graph.shape[0]
+        self.indptr = graph.indptr.tolist()
+        self.indices = graph.indices.tolist()
+        self.weights = graph.data.tolist()
+        self.xs = points[:, 0].tolist()
+        self.ys = points[:, 1].tolist()
+        self.extra = {}
+        self.extra_points = {}
+
+    def with_extra(
+            self,
+            extra_edges: tuple = ((), (), ()),
+            extra_points: np.ndarray = None
+        ) -> "Adjacency":
+        #Shallow copy with temporary vertices appended after the roadmap ones
+        adjacency = object.__new__(type(self))
+        adjacency.__dict__.update(self.__dict__)
+        adjacency.extra = {}
+        for u, v, weight in zip(*(np.asarray(array).tolist() for array in extra_edges)):
+            adjacency.extra.setdefault(u, []).append((v, weight))
+            adjacency.extra.setdefault(v, []).append((u, weight))
+        adjacency.extra_points = {}
+        if extra_points is not None:
+            for vertex, point in enumerate(np.asarray(extra_points).tolist(), len(self.xs)):
+                adjacency.extra_points[vertex] = tuple(point)
+        return adjacency
+
+    def position(self, vertex: int) -> tuple:
+        if vertex < len(self.xs):
+            return self.xs[vertex], self.ys[vertex]
+        return self.extra_points[vertex]
+
+    def remove_edges(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        #Removed edges stay in place with an infinite weight
+        for u, v in zip(rows.tolist(), cols.tolist()):
+            for a, b in ((u, v), (v, u)):
+                for k in range(self.indptr[a], self.indptr[a + 1]):
+                    if self.indices[k] == b:
+                        self.weights[k] = math.inf
+
+    def neighbors(self, vertex: int) -> object:
+        extra = self.extra.get(vertex, ())
+        if vertex >= self.n_vertices:
+            return extra
+        begin, end = self.indptr[vertex], self.indptr[vertex + 1]
+        neighbors = zip(self.indices[begin:end], self.weights[begin:end])
+        return chain(neighbors, extra) if extra else neighbors
+
+
+class ArrayAdjacency(Adjacency):
+    def __init__(
+            self,
+            indptr: np.ndarray,
+            indices: np.ndarray,
+            weights: np.ndarray,
+            points: np.ndarray
+        ) -> None:
+        #Wraps a symmetric CSR without copying it, e.g. from shared memory
+        self.n_vertices = len(indptr) - 1
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.xs = points[:, 0]
+        self.ys = points[:, 1]
+        self.extra = {}
+        self.extra_points = {}
+
+    def position(self, vertex: int) -> tuple:
+        if vertex < len(self.xs):
+            return float(self.xs[vertex]), float(self.ys[vertex])
+        return self.extra_points[vertex]
+
+    def neighbors(self, vertex: int) -> object:
+        extra = self.extra.get(vertex, ())
+        if vertex >= self.n_vertices:
+            return extra
+        begin, end = int(self.indptr[vertex]), int(self.indptr[vertex + 1])
+        neighbors = zip(
+            self.indices[begin:end].tolist(),
+            self.weights[begin:end].tolist()
+        )
+        return chain(neighbors, extra) if extra else neighbors
+
+
+def query_edges(
+        endpoints: np.ndarray,
+        n_vertices: int,
+        neighbors: object,
+        component: object,
+        collides: object
+    ) -> tuple:
+    #Edges joining start and goal, temporary vertices n_vertices and
+    #n_vertices + 1, to the roadmap, or None when no path can join them;
+    #neighbors(point) returns the ids and distances of its free neighbors
+    start_idxs, start_dists = neighbors(endpoints[0])
+    goal_idxs, goal_dists = neighbors(endpoints[1])
+    rows = [start_idxs, goal_idxs]
+    cols = [
+        np.full(len(start_idxs), n_vertices),
+        np.full(len(goal_idxs), n_vertices + 1)
+    ]
+    weights = [start_dists, goal_dists]
+    direct = not collides(endpoints[0], endpoints[1])[0]
+    if direct:
+        rows.append([n_vertices])
+        cols.append([n_vertices + 1])
+        weights.append([np.linalg.norm(endpoints[1] - endpoints[0])])
+
+    start_roots = {component(i) for i in start_idxs.tolist()}
+    goal_roots = {component(i) for i in goal_idxs.tolist()}
+    if not direct and not start_roots & goal_roots:
+        return None
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+
+
+def trace(predecessors: dict, vertex: int) -> list:
+    path = [vertex]
+    while predecessors[vertex] >= 0:
+        vertex = predecessors[vertex]
+        path.append(vertex)
+    return path
+
+
+def astar(adjacency: Adjacency, i: int, j: int) -> tuple:
+    #Euclidean distance never overestimates a path of Euclidean edges
+    position = adjacency.position
+    goal_x, goal_y = position(j)
+    start_x, start_y = position(i)
+    costs = {i: 0.0}
+    predecessors = {i: -1}
+    closed = set()
+    heap = [(math.hypot(start_x - goal_x, start_y - goal_y), 0.0, i)]
+    while heap:
+        _, cost, vertex = heapq.heappop(heap)
+        if vertex in closed:
+            continue
+        if vertex == j:
+            return cost, trace(predecessors, j), len(closed)
+        closed.add(vertex)
+        for neighbor, weight in adjacency.neighbors(vertex):
+            new_cost = cost + weight
+            if neighbor in closed or new_cost >= costs.get(neighbor, math.inf):
+                continue
+            costs[neighbor] = new_cost
+            predecessors[neighbor] = vertex
+            x, y = position(neighbor)
+            estimate = new_cost + math.hypot(x - goal_x, y - goal_y)
+            heapq.heappush(heap, (estimate, new_cost, neighbor))
+    return math.inf, [], len(closed)
+
+
+def bidirectional_dijkstra(adjacency: Adjacency, i: int, j: int) -> tuple:
+    costs = ({i: 0.0}, {j: 0.0})
+    predecessors = ({i: -1}, {j: -1})
+    closed = (set(), set())
+    heaps = ([(0.0, i)], [(0.0, j)])
+    best, meeting = (math.inf, -1) if i != j else (0.0, i)
+    while heaps[0] and heaps[1]:
+        #Once both frontiers are past the best meeting cost it cannot improve
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        cost, vertex = heapq.heappop(heaps[side])
+        if vertex in closed[side]:
+            continue
+        closed[side].add(vertex)
+        other_costs = costs[1 - side]
+        for neighbor, weight in adjacency.neighbors(vertex):
+            #Edges removed by remove_edges never reach the neighbor
+            if weight == math.inf:
+                continue
+            new_cost = cost + weight
+            if new_cost < costs[side].get(neighbor, math.inf):
+                costs[side][neighbor] = new_cost
+                predecessors[side][neighbor] = vertex
+                heapq.heappush(heaps[side], (new_cost, neighbor))
+            if neighbor in other_costs:
+                total = costs[side][neighbor] + other_costs[neighbor]
+                if total < best:
+                    best, meeting = total, neighbor
+    expanded = len(closed[0]) + len(closed[1])
+    if meeting < 0:
+        return math.inf, [], expanded
+    path = trace(predecessors[0], meeting)[::-1][:-1] + trace(predecessors[1], meeting)
+    #Paths run from j back to i, as in astar
+    return best, path[::-1], expanded
+
+
+SEARCHES = {
+    "astar": astar,
+    "bidirectional": bidirectional_dijkstra,
+}
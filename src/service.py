@@ -0,0 +1,290 @@
+from argparse import ArgumentParser
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+import numpy as np
+
+from scene.geometry import Point
+from scenarios import SCENES, load_polygons
+from prm import ProbabilisticRandomMap
+from collision_cache import CollisionCache
+
+
+class PlanningService:
+    def __init__(
+            self,
+            radius: float = 0.03,
+            th: float = 0.5,
+            warm_milestones: int = 2000,
+            growth_step: int = 250,
+            batch_window: float = 0,
+            cache_size: int = 0,
+            scene_files: list = (),
+            **planner_kwargs
+        ) -> None:
+        self.radius = radius
+        self.th = th
+        self.warm_milestones = warm_milestones
+        self.growth_step = growth_step
+        #Seconds a query waits for others to share its planner call, with 0
+        #only the queries that arrived in the same loop turn go together
+        self.batch_window = batch_window
+        self.cache = CollisionCache(cache_size) if cache_size else None
+        #Only scene names and the files given at startup can be loaded
+        self.scenes = set(SCENES) | set(scene_files)
+        self.planner_kwargs = planner_kwargs
+        self.planners = {}
+        self.locks = {}
+        self.pending = {}
+        #The loop keeps only weak references to tasks, flushes are kept here
+        self.flushes = set()
+        #Planners are not thread safe, all their work runs on this thread
+        self.executor = ThreadPoolExecutor(1)
+
+    async def run_planner(self, function: object, *args) -> object:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def planner(self, scene: str) -> ProbabilisticRandomMap:
+        if scene not in self.scenes:
+            raise RuntimeError(f"Unknown scene: {scene}")
+        lock = self.locks.setdefault(scene, asyncio.Lock())
+        async with lock:
+            if scene not in self.planners:
+                self.planners[scene] = await self.run_planner(self.build, scene)
+        return self.planners[scene]
+
+    def build(self, scene: str) -> ProbabilisticRandomMap:
+        prm = ProbabilisticRandomMap(
+            load_polygons(scene),
+            self.radius,
+            Point(0, 0),
+            Point(0, 0),
+            persistent = True,
+            cache = self.cache,
+            **self.planner_kwargs
+        )
+        self.grow(prm, self.warm_milestones)
+        return prm
+
+    def grow(self, prm: ProbabilisticRandomMap, n_milestones: int) -> int:
+        while len(prm.milestones) < n_milestones:
+            step = min(self.growth_step, n_milestones - len(prm.milestones))
+            prm.connect(prm.sample(step), self.th)
+        return len(prm.milestones)
+
+    def point(self, value: object) -> list:
+        point = []
+        if isinstance(value, (list, tuple)) and len(value) == 2:
+            try:
+                point = [float(coordinate) for coordinate in value]
+            except (TypeError, ValueError):
+                pass
+        if len(point) != 2 or not all(np.isfinite(point)):
+            raise RuntimeError(f"Expected a point [x, y], got {value!r}")
+        return point
+
+    async def query(self, scene: str, start: list, goal: list) -> dict:
+        #Checked before joining a batch, a bad point must not fail the others
+        start, goal = self.point(start), self.point(goal)
+        prm = await self.planner(scene)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        batch = self.pending.setdefault(scene, [])
+        batch.append((start, goal, future))
+        if len(batch) == 1:
+            loop.call_later(self.batch_window, self.schedule_flush, scene, prm)
+        cost, path = await future
+        points = path.points if path else []
+        return {
+            "cost": cost if np.isfinite(cost) else None,
+            "path": [[float(point.x), float(point.y)] for point in points],
+        }
+
+    def schedule_flush(self, scene: str, prm: ProbabilisticRandomMap) -> None:
+        task = asyncio.ensure_future(self.flush(scene, prm))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def flush(self, scene: str, prm: ProbabilisticRandomMap) -> None:
+        batch = self.pending.pop(scene, [])
+        if not batch:
+            return
+        try:
+            starts = np.array([start for start, _, _ in batch], dtype=float)
+            goals = np.array([goal for _, goal, _ in batch], dtype=float)
+            results = await self.run_planner(prm.query_many, starts, goals, self.th)
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def grow_scene(self, scene: str, n_milestones: int) -> dict:
+        prm = await self.planner(scene)
+        size = await self.run_planner(self.grow, prm, n_milestones)
+        return {"milestones": size, "edges": len(prm.edges)}
+
+    def stats(self) -> dict:
+        return {
+            scene: {
+                "milestones": len(prm.milestones),
+                "edges": len(prm.edges),
+                **prm.stats(),
+            }
+            for scene, prm in self.planners.items()
+        }
+
+    async def handle_request(self, request: dict) -> dict:
+        op = request.get("op", "query")
+        if op == "query":
+            return await self.query(request["scene"], request["start"], request["goal"])
+        if op == "grow":
+            return await self.grow_scene(request["scene"], int(request["milestones"]))
+        if op == "stats":
+            return self.stats()
+        raise RuntimeError(f"Unknown op: {op}")
+
+    async def respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        request = {}
+        try:
+            request = json.loads(line)
+            response = await self.handle_request(request)
+        except Exception as exc:
+            #Every request gets a reply, whatever went wrong
+            response = {"error": f"{type(exc).__name__}: {exc}"}
+        if isinstance(request, dict) and "id" in request:
+            response["id"] = request["id"]
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def handle_connection(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+        ) -> None:
+        #Requests of one connection run concurrently, replies carry their id
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        for prm in self.planners.values():
+            prm.close()
+
+
+async def serve(args: object) -> None:
+    service = PlanningService(
+        radius = args.radius,
+        th = args.th,
+        warm_milestones = args.milestones,
+        batch_window = args.batch_window/1000,
+        cache_size = args.cache,
+        scene_files = args.scenes,
+    )
+    for scene in args.scenes:
+        await service.planner(scene)
+    if args.socket:
+        server = await asyncio.start_unix_server(service.handle_connection, args.socket)
+        address = args.socket
+    else:
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+        address = f"{args.host}:{args.port}"
+    print(f"Serving {', '.join(service.planners) or 'no scenes yet'} on {address}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--socket",
+        default = None,
+        help = "Socket Unix donde escuchar (por defecto TCP en --host/--port)"
+    )
+    parser.add_argument(
+        "--host",
+        default = "127.0.0.1",
+        help = "Dirección TCP"
+    )
+    parser.add_argument(
+        "--port",
+        default = 8765,
+        type = int,
+        help = "Puerto TCP"
+    )
+    parser.add_argument(
+        "--scenes",
+        default = ["default_polygons"],
+        nargs = "*",
+        help = "Escenarios precargados: nombres o archivos JSON de polígonos"
+    )
+    parser.add_argument(
+        "--milestones",
+        default = 2000,
+        type = int,
+        help = "Milestones del roadmap de cada escenario al arrancar"
+    )
+    parser.add_argument(
+        "--batch-window",
+        default = 0.0,
+        type = float,
+        help = "Milisegundos que una consulta espera a otras para resolverlas juntas"
+    )
+    parser.add_argument(
+        "--cache",
+        default = 0,
+        type = int,
+        help = "Entradas de la caché de colisiones (0: desactivada)"
+    )
+    parser.add_argument(
+        "--radius",
+        default = 0.03,
+        type = float,
+        help = "Radio del robot"
+    )
+    parser.add_argument(
+        "--th",
+        default = 0.5,
+        type = float,
+        help = "Distancia máxima entre milestones conectados"
+    )
+    parser.add_argument(
+        "--seed",
+        default = 0,
+        type = int,
+        help = "Semilla"
+    )
+
+    args = parser.parse_args()
+    return args
+
+def main() -> None:
+    args = parse_args()
+    np.random.seed(args.seed)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,20 @@
-from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
 
-from scene.scenes import Point, GLUtils
+from scene.geometry import Point
+
+
+def gl_utils() -> object:
+    #Rendering pulls in pygame and OpenGL, only load them when drawing
+    from scene.scenes import GLUtils
+    return GLUtils
+
 
 class Segment:
     def __init__(self, point_i: Point, point_j: Point) -> None:
         self.points = [point_i, point_j]
     
     def draw(self, **kwargs) -> None:
-        GLUtils.draw_line(self.points, **kwargs)
+        gl_utils().draw_line(self.points, **kwargs)
 
     def len(self) -> float:
         return (
@@ -40,9 +45,18 @@ class Polygon:
         else:
             raise RuntimeError("Not recgonized data type")
         self.len = len(self.points)
+        self.vertices = np.array(
+            [[point.x, point.y] for point in self.points],
+            dtype = float
+        )
+        self.low = self.vertices.min(axis=0)
+        self.high = self.vertices.max(axis=0)
+
+    def inflated_bounds(self, th: float) -> tuple:
+        return self.low - th, self.high + th
 
     def draw(self, **kwargs) -> None:
-        GLUtils.draw_polygon(self.points, **kwargs)
+        gl_utils().draw_polygon(self.points, **kwargs)
 
 
 class Path:
@@ -50,7 +64,7 @@ class Path:
         self.points = points
 
     def draw(self, **kwargs) -> None:
-        GLUtils.draw_line(
+        gl_utils().draw_line(
             self.points,
             **kwargs
         )
@@ -79,4 +93,4 @@ class Circle:
         ]
         if "color" in kwargs:
             kwargs["edge_color"] = kwargs.pop("color")
-        GLUtils.draw_polygon(points, draw_points=False, **kwargs)
+        gl_utils().draw_polygon(points, draw_points=False, **kwargs)
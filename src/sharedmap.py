@@ -0,0 +1,358 @@
+from argparse import ArgumentParser
+import json
+from multiprocessing import shared_memory, resource_tracker
+import signal
+import sys
+import time
+
+import numpy as np
+
+from scene.geometry import Point
+from shapes import Path
+import collisions
+from validation import EdgeValidator
+from search import ArrayAdjacency, astar, query_edges
+
+
+#sequence (odd while a generation is being published), generation
+HEADER_FIELDS = 2
+ALIGNMENT = 64
+
+
+def attach_segment(name: str) -> shared_memory.SharedMemory:
+    #Readers must not register segments they did not create, the resource
+    #tracker would unlink them when the reader exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def roadmap_arrays(prm: object, cell_size: float) -> tuple:
+    #Milestones sorted by grid cell, so a cell is a contiguous range of ids
+    from scipy.sparse.csgraph import connected_components
+
+    milestones = prm.milestones.array
+    low = milestones.min(axis=0)
+    keys = np.floor((milestones - low)/cell_size).astype(np.int64)
+    dims = keys.max(axis=0) + 1
+    cells = keys[:, 0]*dims[1] + keys[:, 1]
+    order = np.argsort(cells, kind="stable")
+
+    graph = prm.get_matrix()
+    graph = graph.maximum(graph.T).tocsr()[order][:, order].tocsr()
+    graph.sort_indices()
+    _, labels = connected_components(graph, directed=False)
+    arrays = {
+        "milestones": np.ascontiguousarray(milestones[order]),
+        "indptr": graph.indptr.astype(np.int64),
+        "indices": graph.indices.astype(np.int32),
+        "weights": graph.data.astype(np.float64),
+        "labels": labels.astype(np.int32),
+        "cell_starts": np.searchsorted(cells[order], np.arange(dims.prod() + 1)),
+    }
+    meta = {
+        "radius": prm.radius,
+        "polygons": prm.stamp,
+        "cell_size": cell_size,
+        "low": low.tolist(),
+        "dims": dims.tolist(),
+    }
+    return arrays, meta
+
+
+class SharedRoadmapWriter:
+    def __init__(self, name: str, cell_size: float = 0.05) -> None:
+        self.name = name
+        self.cell_size = cell_size
+        self.header_segment = shared_memory.SharedMemory(
+            name,
+            create = True,
+            size = HEADER_FIELDS*8
+        )
+        self.header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=self.header_segment.buf)
+        self.header[:] = 0
+        self.segment = None
+
+    def publish(self, prm: object) -> int:
+        #A new segment per generation, readers keep the old one mapped until
+        #they refresh, so nothing is ever overwritten under them
+        arrays, meta = roadmap_arrays(prm, self.cell_size)
+        generation = int(self.header[1]) + 1
+        offset = ALIGNMENT
+        meta["arrays"] = {}
+        for key, array in arrays.items():
+            meta["arrays"][key] = [offset, array.dtype.str, list(array.shape)]
+            offset += -(-array.nbytes//ALIGNMENT)*ALIGNMENT
+        encoded = json.dumps(meta).encode()
+        meta_offset = offset
+        segment = shared_memory.SharedMemory(
+            f"{self.name}-{generation}",
+            create = True,
+            size = meta_offset + len(encoded)
+        )
+        np.ndarray(2, dtype=np.int64, buffer=segment.buf)[:] = meta_offset, len(encoded)
+        segment.buf[meta_offset: meta_offset + len(encoded)] = encoded
+        for key, array in arrays.items():
+            begin = meta["arrays"][key][0]
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=begin)[...] = array
+
+        #Seqlock, an odd sequence tells readers to retry
+        self.header[0] += 1
+        self.header[1] = generation
+        self.header[0] += 1
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+        self.segment = segment
+        return generation
+
+    def close(self) -> None:
+        if self.segment is not None:
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
+        self.header = None
+        self.header_segment.close()
+        self.header_segment.unlink()
+
+
+class SharedRoadmap:
+    def __init__(
+            self,
+            name: str,
+            polygons: list,
+            radius: float,
+            clearance: object = None,
+            cache: object = None
+        ) -> None:
+        self.name = name
+        self.polygons = polygons
+        self.radius = radius
+        self.stamp = collisions.polygons_hash(polygons)
+        self.validator = EdgeValidator(polygons, radius, clearance = clearance, cache = cache)
+        self.header_segment = attach_segment(name)
+        self.header = np.ndarray(HEADER_FIELDS, dtype=np.int64, buffer=self.header_segment.buf)
+        self.segment = None
+        self.generation = 0
+        self.refresh()
+
+    def read_generation(self) -> int:
+        while True:
+            sequence = int(self.header[0])
+            generation = int(self.header[1])
+            if sequence % 2 == 0 and int(self.header[0]) == sequence:
+                return generation
+            time.sleep(0)
+
+    def refresh(self) -> bool:
+        #Maps the latest generation, True if it changed
+        generation = self.read_generation()
+        while generation and generation != self.generation:
+            try:
+                segment = attach_segment(f"{self.name}-{generation}")
+            except FileNotFoundError:
+                #Replaced while attaching, the header already names a newer one
+                generation = self.read_generation()
+                continue
+            try:
+                self.map_segment(segment)
+            except RuntimeError:
+                segment.close()
+                raise
+            self.generation = generation
+            return True
+        if not generation:
+            raise RuntimeError(f"Nothing published yet on {self.name}")
+        return False
+
+    def map_segment(self, segment: shared_memory.SharedMemory) -> None:
+        meta_offset, meta_len = np.ndarray(2, dtype=np.int64, buffer=segment.buf)
+        meta = json.loads(bytes(segment.buf[meta_offset: meta_offset + meta_len]))
+        if meta["radius"] != self.radius:
+            raise RuntimeError(
+                f"Roadmap was built for radius {meta['radius']}, not {self.radius}"
+            )
+        if meta["polygons"] != self.stamp:
+            raise RuntimeError("Roadmap was built for a different polygon set")
+        arrays = {
+            key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf, offset=offset)
+            for key, (offset, dtype, shape) in meta["arrays"].items()
+        }
+        for array in arrays.values():
+            array.flags.writeable = False
+        self.close_segment()
+        self.segment = segment
+        self.meta = meta
+        self.milestones = arrays["milestones"]
+        self.labels = arrays["labels"]
+        self.cell_starts = arrays["cell_starts"]
+        self.low = np.array(meta["low"])
+        self.dims = np.array(meta["dims"])
+        self.adjacency = ArrayAdjacency(
+            arrays["indptr"],
+            arrays["indices"],
+            arrays["weights"],
+            self.milestones
+        )
+
+    def __len__(self) -> int:
+        return len(self.milestones)
+
+    def neighbors(self, point: np.ndarray, th: float, max_nn: int) -> tuple:
+        cell_size = self.meta["cell_size"]
+        center = np.floor((point - self.low)/cell_size).astype(np.int64)
+        ring = int(np.ceil(th/cell_size))
+        low = np.clip(center - ring, 0, self.dims - 1)
+        high = np.clip(center + ring, 0, self.dims - 1)
+        if np.any(center + ring < 0) or np.any(center - ring >= self.dims):
+            return np.zeros(0, dtype=int), np.zeros(0)
+        xs, ys = np.meshgrid(
+            np.arange(low[0], high[0] + 1),
+            np.arange(low[1], high[1] + 1),
+            indexing = "ij"
+        )
+        cells = (xs*self.dims[1] + ys).ravel()
+        begins, ends = self.cell_starts[cells], self.cell_starts[cells + 1]
+        counts = ends - begins
+        idxs = np.repeat(begins - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        dists = np.linalg.norm(self.milestones[idxs] - point, axis=1)
+        near = dists < th
+        idxs, dists = idxs[near], dists[near]
+        if len(idxs) > max_nn:
+            nearest = np.argpartition(dists, max_nn - 1)[:max_nn]
+            idxs, dists = idxs[nearest], dists[nearest]
+        free = ~self.validator(self.milestones[idxs], point)
+        return idxs[free], dists[free]
+
+    def query(self, start: Point, goal: Point, th: float = 0.5, max_nn: int = 20) -> tuple:
+        #Returns (cost, path), the path running from start to goal
+        n_milestones = len(self)
+        endpoints = np.array([[start.x, start.y], [goal.x, goal.y]])
+        extra_edges = query_edges(
+            endpoints,
+            n_milestones,
+            lambda point: self.neighbors(point, th, max_nn),
+            self.labels.__getitem__,
+            self.validator
+        )
+        if extra_edges is None:
+            return np.inf, None
+
+        adjacency = self.adjacency.with_extra(extra_edges, endpoints)
+        cost, path, _ = astar(adjacency, n_milestones, n_milestones + 1)
+        if not path:
+            return np.inf, None
+        return cost, Path([Point(*adjacency.position(vertex)) for vertex in reversed(path)])
+
+    def close_segment(self) -> None:
+        if self.segment is None:
+            return
+        #Views into the buffer must go before the segment can be closed
+        self.adjacency = self.milestones = self.labels = self.cell_starts = None
+        self.segment.close()
+        self.segment = None
+
+    def close(self) -> None:
+        self.close_segment()
+        self.header = None
+        self.header_segment.close()
+        self.validator.close()
+
+
+def parse_args() -> object:
+    parser = ArgumentParser()
+
+    parser.add_argument(
+        "--name",
+        default = "prm",
+        help = "Nombre de la memoria compartida"
+    )
+    parser.add_argument(
+        "--scene",
+        default = "default_polygons",
+        help = "default_polygons, patologycal_grid, narrow_passage o un archivo JSON de polígonos"
+    )
+    parser.add_argument(
+        "--milestones",
+        default = [10000],
+        type = int,
+        nargs = "+",
+        help = "Tamaños del roadmap publicados uno tras otro"
+    )
+    parser.add_argument(
+        "--step",
+        default = 1000,
+        type = int,
+        help = "Milestones muestreados por iteración de construcción"
+    )
+    parser.add_argument(
+        "--cell-size",
+        default = 0.05,
+        type = float,
+        help = "Lado de las celdas del índice de vecinos compartido"
+    )
+    parser.add_argument(
+        "--radius",
+        default = 0.03,
+        type = float,
+        help = "Radio del robot"
+    )
+    parser.add_argument(
+        "--th",
+        default = 0.5,
+        type = float,
+        help = "Distancia máxima entre milestones conectados"
+    )
+    parser.add_argument(
+        "--seed",
+        default = 0,
+        type = int,
+        help = "Semilla"
+    )
+
+    args = parser.parse_args()
+    return args
+
+def main() -> None:
+    from prm import ProbabilisticRandomMap
+    from scenarios import load_polygons
+
+    args = parse_args()
+    np.random.seed(args.seed)
+    prm = ProbabilisticRandomMap(
+        load_polygons(args.scene),
+        args.radius,
+        Point(0, 0),
+        Point(0, 0),
+        persistent = True
+    )
+    writer = SharedRoadmapWriter(args.name, args.cell_size)
+    #Segments outlive the process, they are unlinked on the way out
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        for n_milestones in args.milestones:
+            while len(prm.milestones) < n_milestones:
+                step = min(args.step, n_milestones - len(prm.milestones))
+                prm.connect(prm.sample(step), args.th)
+            generation = writer.publish(prm)
+            print(
+                f"Generation {generation}: {len(prm.milestones)} milestones, "
+                f"{len(prm.edges)} edges on {args.name}"
+            )
+        print("Serving until interrupted")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        prm.close()
+
+
+if __name__ == '__main__':
+    main()
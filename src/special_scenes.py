@@ -1,8 +1,12 @@
+import time
+
 import pygame
 
 from scene.scenes import Point, GLScene, GLUtils
-from shapes import Polygon, Circle
+from shapes import Circle
 from prm import ProbabilisticRandomMap
+from collision_cache import CollisionCache
+from scenarios import default_polygons, patologycal_grid
 
 
 class Blinker:
@@ -20,18 +24,6 @@ class Blinker:
         if self.call:
             self.to_call(**self.kwargs)
 
-default_polygons = [
-    Polygon([[-0.8, 0.2], [-0.6, 0.6], [-0.5, 0.4], [-0.15, 0.27]]),
-    Polygon([[-0.5, -0.6], [-0.8, -0.6], [-0.2, -0.4], [-0.46, -0.92]]),
-    Polygon([[0.33, -0.12], [0, -0.2], [0.2, 0.2], [0.4, 0.04], [0.8, 0.2], [0.62, -0.27]])
-]
-
-patologycal_grid = [
-    Polygon([[-0.8, -0.4], [-0.75, 0.4], [-0.45, 0.4], [-0.4, -0.4]]),
-    Polygon([[-0.15, -0.4], [-0.2, 0.4], [0.2, 0.4], [0.15, -0.4]]),
-    Polygon([[0.4, -0.4], [0.45, 0.4], [0.75, 0.4], [0.8, -0.4]]),
-]
-
 
 class PolygonScene(GLScene):
     def __init__(
@@ -57,8 +49,25 @@ class PolygonScene(GLScene):
 
 
 class PrmScene(PolygonScene):
-    def __init__(self, title: str, width: int, height: int, max_fps: int = 60, **kwargs) -> None:
+    def __init__(
+            self,
+            title: str,
+            width: int,
+            height: int,
+            max_fps: int = 60,
+            persistent: bool = False,
+            stats: bool = False,
+            lazy: bool = False,
+            sampler: str = "uniform",
+            batch_size: int = 1,
+            search: str = "astar",
+            cache_size: int = 0,
+            budget: float = 0.0,
+            **kwargs
+        ) -> None:
         super().__init__(title, width, height, max_fps, **kwargs)
+        #Seconds of planning per frame, a single update when zero
+        self.budget = budget
         self.start = Circle(Point(0, 0), 0.03)
         self.goal = Point(-0.5, 0)
         self.pause = True
@@ -66,8 +75,15 @@ class PrmScene(PolygonScene):
             self.polygons,
             self.start.radius,
             self.start.center,
-            self.goal
+            self.goal,
+            persistent = persistent,
+            stats = stats,
+            lazy = lazy,
+            sampler = sampler,
+            search = search,
+            cache = CollisionCache(cache_size) if cache_size else None
         )
+        self.batch_size = batch_size
         self.update_cycle = 0
         self.blinker = Blinker(
             lambda **kwargs: GLUtils.draw_points([self.goal], **kwargs),
@@ -94,12 +110,24 @@ class PrmScene(PolygonScene):
                     self.goal = ortho
                     self.prm.reset(self.start.center, self.goal)
 
+    def caption(self) -> str:
+        caption = super().caption()
+        if self.prm.telemetry.enabled:
+            caption += f" {self.prm.telemetry.summary()}"
+            if self.prm.cache is not None:
+                cache = self.prm.cache
+                caption += f" cache={cache.hits}/{cache.hits + cache.misses}"
+        return caption
+
     def update(self) -> None:
         super().update()
         if self.pause:
             return
-        if not self.prm.finished():
-            self.prm.update()
+        deadline = time.perf_counter() + self.budget
+        while not self.prm.finished():
+            self.prm.update(batch_size = self.batch_size)
+            if time.perf_counter() >= deadline:
+                break
 
     def render(self) -> None:
         super().render()
@@ -0,0 +1,50 @@
+from contextlib import nullcontext
+import time
+
+
+class Timer:
+    def __init__(self, timers: dict, name: str) -> None:
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.begin = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.begin
+        self.timers[self.name] = self.timers.get(self.name, 0.0) + elapsed
+
+
+class PlannerStats:
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.disabled_timer = nullcontext()
+        self.reset()
+
+    def reset(self) -> None:
+        self.counters = {}
+        self.timers = {}
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def timer(self, name: str) -> object:
+        if not self.enabled:
+            return self.disabled_timer
+        return Timer(self.timers, name)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "seconds": dict(self.timers),
+        }
+
+    def summary(self) -> str:
+        counters = " ".join(
+            f"{name}={value}" for name, value in self.counters.items()
+        )
+        timers = " ".join(
+            f"{name}={seconds*1000:.0f}ms" for name, seconds in self.timers.items()
+        )
+        return f"{counters} {timers}".strip()
@@ -0,0 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import collisions
+
+
+_polygons = None
+_radius = None
+_clearance = None
+
+
+def init_worker(polygons: list, radius: float, clearance: object) -> None:
+    global _polygons, _radius, _clearance
+    _polygons = polygons
+    _radius = radius
+    _clearance = clearance
+
+
+def validate_chunk(chunk: tuple) -> np.ndarray:
+    starts, ends = chunk
+    return collisions.segments_collide(
+        starts,
+        ends,
+        _polygons,
+        _radius,
+        _clearance
+    )
+
+
+class EdgeValidator:
+    def __init__(
+            self,
+            polygons: list,
+            radius: float,
+            workers: int = 0,
+            chunk_size: int = 256,
+            clearance: object = None,
+            cache: object = None
+        ) -> None:
+        self.polygons = polygons
+        self.radius = radius
+        self.clearance = clearance
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.stamp = collisions.polygons_hash(polygons) if cache is not None else None
+        self.executor = None
+        if workers > 1:
+            #Polygons are shipped once per worker, not with every chunk
+            self.executor = ProcessPoolExecutor(
+                workers,
+                initializer = init_worker,
+                initargs = (polygons, radius, clearance)
+            )
+
+    def __call__(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        if self.cache is None:
+            return self.validate(starts, ends)
+        starts, ends = np.broadcast_arrays(starts, ends)
+        keys = self.cache.segment_keys(starts, ends, self.radius, self.stamp)
+        return self.cache.lookup(
+            keys,
+            lambda idxs: self.validate(starts[idxs], ends[idxs])
+        )
+
+    def validate(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        if self.executor is None or len(starts) <= self.chunk_size:
+            return collisions.segments_collide(
+                starts,
+                ends,
+                self.polygons,
+                self.radius,
+                self.clearance
+            )
+        starts, ends = np.broadcast_arrays(starts, ends)
+        chunks = (
+            (starts[begin: begin + self.chunk_size], ends[begin: begin + self.chunk_size])
+            for begin in range(0, len(starts), self.chunk_size)
+        )
+        #map keeps the submission order, so results do not depend on timing
+        return np.concatenate(list(self.executor.map(validate_chunk, chunks)))
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None